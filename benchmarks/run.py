@@ -0,0 +1,283 @@
+"""
+Performance benchmarks for the hot paths of the locust-cloud CLI.
+
+    uv run python benchmarks/run.py --output benchmark.json
+
+Results are written as JSON so they can be compared between releases.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import gevent
+import gevent.pywsgi
+import socketio
+import socketio.exceptions
+from geventwebsocket.handler import WebSocketHandler
+from locust_cloud.args import expanded, flat_transfer_encoded_args_files, zip_project_paths
+from locust_cloud.common import __version__
+from locust_cloud.import_finder import get_imported_files
+from locust_cloud.websocket import Deadline, Websocket
+
+SESSION_ID = "benchmark-session-id"
+BENCHMARK_EVENT = re.compile(r"event (?P<seq>\d+) sent (?P<sent>[\d.]+)$")
+
+
+def timed(func: Callable, repeat: int = 3) -> dict:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return {"min": min(durations), "median": statistics.median(durations), "repeat": repeat}
+
+
+@contextlib.contextmanager
+def chdir(path: Path):
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def make_flat_project(root: Path, file_count: int) -> Path:
+    project = root / f"flat_{file_count}"
+    for i in range(file_count):
+        package = project / f"pkg{i // 100}"
+        package.mkdir(parents=True, exist_ok=True)
+        (package / f"module{i}.py").write_text(f"VALUE = {i}\n" + "x = 'some padding'\n" * 20)
+    return project
+
+
+def make_import_chain(root: Path, depth: int) -> Path:
+    chain = root / "chain"
+    chain.mkdir()
+    for i in range(depth):
+        next_import = f"import chain.chain_{i + 1}\n" if i + 1 < depth else ""
+        (chain / f"chain_{i}.py").write_text(f"{next_import}def f{i}():\n    return {i}\n")
+    (root / "chain_locustfile.py").write_text("import chain.chain_0\n")
+    return root / "chain_locustfile.py"
+
+
+def make_binaries(root: Path, count: int, size_mb: int) -> list[Path]:
+    binaries = root / "binaries"
+    binaries.mkdir()
+    paths = []
+    for i in range(count):
+        path = binaries / f"helper_{i}-1.0-py3-none-any.whl"
+        path.write_bytes(os.urandom(size_mb * 1024 * 1024))
+        paths.append(path)
+    return paths
+
+
+def bench_packaging(results: dict, root: Path, sizes: list[int], binary_mb: int) -> None:
+    for file_count in sizes:
+        project = make_flat_project(root, file_count)
+        with chdir(root):
+            relative = project.relative_to(root)
+            results[f"expanded_{file_count}_files"] = timed(lambda: list(expanded([relative])))
+            results[f"zip_project_paths_{file_count}_files"] = timed(lambda: zip_project_paths([relative]))
+
+    binaries = make_binaries(root, 4, binary_mb)
+    results[f"flat_transfer_encoded_args_files_4x{binary_mb}MB"] = timed(
+        lambda: flat_transfer_encoded_args_files(binaries, "extra-packages")
+    )
+    with chdir(root):
+        results[f"zip_project_paths_4x{binary_mb}MB"] = timed(
+            lambda: zip_project_paths([b.relative_to(root) for b in binaries])
+        )
+
+
+def bench_imports(results: dict, root: Path, depth: int) -> None:
+    locustfile = make_import_chain(root, depth)
+    with chdir(root):
+        sys.path.insert(0, str(root))
+        try:
+            result = timed(lambda: get_imported_files(locustfile.relative_to(root)))
+            result["files"] = len(get_imported_files(locustfile.relative_to(root)))
+            results[f"get_imported_files_depth_{depth}"] = result
+        finally:
+            sys.path.remove(str(root))
+
+
+class LagRecorder(io.StringIO):
+    """
+    Stands in for stdout, recording how long after being emitted each event was written.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lags: dict[int, float] = {}
+
+    def write(self, text: str) -> int:
+        now = time.perf_counter()
+        for line in text.splitlines():
+            if match := BENCHMARK_EVENT.search(line):
+                self.lags.setdefault(int(match["seq"]), now - float(match["sent"]))
+        return len(text)
+
+
+def bench_websocket(results: dict, rates: list[int], duration: float, batch_size: int = 100) -> None:
+    """
+    Emit events at a fixed rate for a fixed duration, and measure how far behind the client
+    writing them falls and how many never arrive.
+    """
+    sio = socketio.Server(async_mode="gevent", always_connect=False)
+    server = gevent.pywsgi.WSGIServer(("127.0.0.1", 0), socketio.WSGIApp(sio), log=None, error_log=None)
+    server.handler_class = WebSocketHandler
+    # gevent-websocket logs every request on the server's logger, ignoring log=None
+    setattr(server, "logger", logging.getLogger("benchmark.requests"))
+    logging.getLogger("benchmark.requests").setLevel(logging.WARNING)
+    server.start()
+    ids = itertools.count(1)
+    sent: dict[str, int] = {}
+
+    @sio.event
+    def connect(sid, environ, auth):  # noqa: ARG001
+        if auth != SESSION_ID:
+            raise socketio.exceptions.ConnectionRefusedError("Session mismatch")
+
+    @sio.event
+    def flood(sid, rate):
+        def emit_events():
+            seq = itertools.count()
+            interval = batch_size / rate
+            start = time.perf_counter()
+            for batch in range(int(duration * rate / batch_size)):
+                gevent.sleep(max(0, start + batch * interval - time.perf_counter()))
+                events = [
+                    {
+                        "type": "stdout",
+                        "message": f"[2025-01-01 00:00:00,000] worker/INFO/locust.runners: event {next(seq)} sent {time.perf_counter()}\n",
+                    }
+                    for _ in range(batch_size)
+                ]
+                sio.emit("events", {"events": events, "id": next(ids)}, to=sid)
+            sent["count"] = next(seq)
+            sio.emit("events", {"events": [{"type": "shutdown", "message": None}], "id": next(ids)}, to=sid)
+
+        gevent.spawn(emit_events)
+
+    try:
+        for rate in rates:
+            ws = Websocket()
+            ws.connect(f"http://127.0.0.1:{server.server_port}", auth=SESSION_ID)
+            ws.wait_timeout = int(duration) + 30
+            recorder = LagRecorder()
+            with contextlib.redirect_stdout(recorder):
+                ws.sio.emit("flood", rate)
+                ws.wait(timeout=True)
+            count = sent.pop("count", 0)
+            ws.shutdown()
+
+            lags = sorted(recorder.lags.values())
+            results[f"websocket_{rate}_events_per_second"] = {
+                "seconds": duration,
+                "sent": count,
+                "received": len(lags),
+                "dropped": count - len(lags),
+                "lag_median": statistics.median(lags) if lags else None,
+                "lag_p99": lags[int(len(lags) * 0.99) - 1] if lags else None,
+                "lag_max": lags[-1] if lags else None,
+            }
+    finally:
+        server.stop()
+
+
+def bench_deadlines(results: dict, resets: int) -> None:
+    """
+    Compare resetting the websocket connection deadline to the threading.Timer per attempt it replaced,
+    counting the extra threads alive at once and how often the event loop wakes up.
+    """
+    hub = gevent.get_hub()
+
+    def measure(reset: Callable[[], None], stop: Callable[[], None]) -> dict:
+        threads = peak = threading.active_count()
+        iteration = hub.loop.iteration
+        start = time.perf_counter()
+        for _ in range(resets):
+            reset()
+            peak = max(peak, threading.active_count())
+        duration = time.perf_counter() - start
+        gevent.sleep(0.5)  # let whatever was woken up run
+        stop()
+        return {"seconds": duration, "extra_threads": peak - threads, "wakeups": hub.loop.iteration - iteration}
+
+    timers: list[threading.Timer] = []
+
+    def reset_timer():
+        stop_timer()
+        timers.append(threading.Timer(60, lambda: None))
+        timers[0].start()
+
+    def stop_timer():
+        if timers:
+            timers.pop().cancel()
+
+    results[f"deadline_timer_per_attempt_{resets}_resets"] = measure(reset_timer, stop_timer)
+
+    deadline = Deadline(lambda: None)
+    results[f"deadline_hub_timer_{resets}_resets"] = measure(lambda: deadline.set(60), deadline.close)
+
+
+def bench_cli_import(results: dict, repeat: int = 5) -> None:
+    def cold_import():
+        subprocess.run([sys.executable, "-c", "import locust_cloud"], check=True)
+
+    results["cold_import_locust_cloud"] = timed(cold_import, repeat=repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark.json", help="File to write the results to")
+    parser.add_argument("--quick", action="store_true", help="Use smaller inputs, for checking that things work")
+    args = parser.parse_args()
+
+    results: dict = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        bench_packaging(results, root, sizes=[1000] if args.quick else [1000, 10000], binary_mb=5 if args.quick else 50)
+        bench_imports(results, root, depth=50 if args.quick else 500)
+
+    bench_websocket(results, rates=[1000] if args.quick else [1000, 10000, 50000], duration=2 if args.quick else 10)
+    bench_deadlines(results, resets=100 if args.quick else 1000)
+    bench_cli_import(results, repeat=2 if args.quick else 5)
+
+    output = {
+        "locust_cloud_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(output, indent=2))
+
+    for name, result in results.items():
+        print(f"{name:50} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,50 @@
+import hashlib
+import json
 import logging
 import os
 import pathlib
+import sys
 import time
 import webbrowser
-from argparse import ArgumentTypeError
+from argparse import ArgumentTypeError, Namespace
+from collections.abc import Callable, Iterable
 from datetime import datetime, timedelta
 from threading import Thread
 
 import requests
+from locust_cloud import web_login
+from locust_cloud.agent import AgentApiSession, AgentClient, AgentError
 from locust_cloud.apisession import ApiSession
 from locust_cloud.args import (
+    ProjectTooLarge,
     combined_cloud_parser,
+    expanded,
     valid_project_path,
     zip_project_paths,
 )
-from locust_cloud.common import CloudConfig, __version__, write_cloud_config
+from locust_cloud.artifacts import download_artifacts
+from locust_cloud.batch import Scenario, load_batch_plan, run_batch
+from locust_cloud.calibrate import calibrate, recommended_workers
+from locust_cloud.common import VALID_REGIONS, CloudConfig, __version__, write_cloud_config
+from locust_cloud.controls import RuntimeControls
+from locust_cloud.dependencies import resolve_dependencies
+from locust_cloud.ignore import IgnoreRules
 from locust_cloud.import_finder import get_imported_files
-from locust_cloud.input_events import input_listener
+from locust_cloud.input_events import InputListener
+from locust_cloud.local_deployer import MISSING_DEPENDENCY, LocalApiSession, LocalDeployer, WebSocketHandler
+from locust_cloud.log_file import LogFile
+from locust_cloud.log_reducer import LogReducer
+from locust_cloud.preflight import Preflight
+from locust_cloud.readiness import ReadinessError, wait_until_ready
+from locust_cloud.regions import nearest_region, run_regions, split_evenly
+from locust_cloud.shards import upload_shards
+from locust_cloud.watch import ProjectWatcher
 from locust_cloud.websocket import SessionMismatchError, Websocket, WebsocketTimeout, engineio_handler
 
 logger = logging.getLogger(__name__)
 
+READY_CONNECT_TIMEOUT = 30
+
 if os.getenv("LOCUSTCLOUD_USER_SUB_ID") and os.getenv("LOCUSTCLOUD_REFRESH_TOKEN") and os.getenv("LOCUSTCLOUD_REGION"):
     config = CloudConfig(
         refresh_token=os.getenv("LOCUSTCLOUD_REFRESH_TOKEN"),
@@ -43,166 +67,296 @@ def configure_logging(loglevel: str) -> None:
     logging.getLogger("urllib3").setLevel(logging.INFO)
 
 
-def main(locustfiles: list[str] | None = None):
-    start_time = datetime.now()
-    options, locust_options = combined_cloud_parser.parse_known_args()
+def project_files(locustfiles: list[pathlib.Path], extra_files: list[pathlib.Path]) -> set[pathlib.Path]:
+    auto_extra_files = set()
+    for lf in locustfiles:
+        auto_extra_files.update(get_imported_files(lf))
 
-    configure_logging(options.loglevel)
+    return set(locustfiles + extra_files + list(auto_extra_files))
 
-    if not locustfiles:
-        logger.error("A locustfile is required to run a test.")
-        return 1
 
-    try:
-        relative_locustfiles: list[pathlib.Path] = [valid_project_path(locustfile) for locustfile in locustfiles]
-    except ArgumentTypeError as e:
-        logger.error(e)
-        return
+def package_project(
+    locustfiles: list[pathlib.Path],
+    extra_files: list[pathlib.Path],
+    max_size_mb: int | None,
+    precompile: bool = False,
+    agent: AgentClient | None = None,
+) -> dict[str, str]:
+    if agent:
+        try:
+            return agent.package(locustfiles, extra_files, max_size_mb, precompile)
+        except AgentError as e:
+            logger.debug(f"The agent could not package the project: {e}")
 
-    session = ApiSession(options.non_interactive)
-    websocket = Websocket()
+    files = project_files(locustfiles, extra_files)
+    logger.debug(f"Project files: {', '.join([str(posix_path) for posix_path in files])}")
 
-    auto_extra_files = set()
-    for lf in relative_locustfiles:
-        auto_extra_files.update(get_imported_files(lf))
+    return zip_project_paths(files, max_size_mb=max_size_mb, precompile=precompile)
 
-    project_files = set(relative_locustfiles + (options.extra_files or []) + list(auto_extra_files))
-    logger.debug(f"Project files: {', '.join([str(posix_path) for posix_path in project_files])}")
 
-    project_data = zip_project_paths(project_files)
+def push_project_update(
+    websocket: Websocket, changed: list[pathlib.Path], deleted: list[pathlib.Path], precompile: bool
+) -> None:
+    """
+    Send changed and deleted project files to the running locust master, which restarts the test with them.
+    """
+    logger.info(f"Project files changed ({', '.join(str(path) for path in changed + deleted)}), restarting the test")
+    if not websocket.sio.connected:
+        logger.warning("Not connected to the locust master, the changes were not sent")
+        return
+
+    websocket.sio.emit(
+        "project_update",
+        {
+            "project_data": zip_project_paths(changed, to_file="update", precompile=precompile) if changed else None,
+            "deleted": [path.as_posix() for path in deleted],
+        },
+    )
 
-    try:
-        logger.info(f"Deploying ({session.region}, locust-cloud {__version__})")
-        locust_env_variables = [
-            {"name": env_variable, "value": os.environ[env_variable]}
-            for env_variable in os.environ
-            if env_variable.startswith("LOCUST_")
-            and env_variable
-            not in [
-                "LOCUST_LOCUSTFILE",
-                "LOCUST_USERS",
-                "LOCUST_WEB_HOST_DISPLAY_NAME",
-                "LOCUST_SKIP_MONKEY_PATCH",
-                "LOCUST_CLOUD",
-                "LOCUST_ENABLE_OPENTELEMETRY",
-            ]
-        ]
 
-        locust_args = [
-            {"name": "LOCUST_LOCUSTFILE", "value": ",".join([str(file) for file in relative_locustfiles])},
-            {"name": "LOCUST_FLAGS", "value": " ".join([option for option in locust_options if option != "--cloud"])},
-            {"name": "LOCUST_LOGLEVEL", "value": options.loglevel},
-            {"name": "LOCUSTCLOUD_DEPLOYER_URL", "value": session.api_url},
-            *locust_env_variables,
+def build_payload(
+    options: Namespace,
+    locust_options: list[str],
+    locustfiles: list[pathlib.Path],
+    project_data: dict[str, str],
+    dependencies: dict,
+    api_url: str,
+) -> dict:
+    locust_env_variables = [
+        {"name": env_variable, "value": os.environ[env_variable]}
+        for env_variable in os.environ
+        if env_variable.startswith("LOCUST_")
+        and env_variable
+        not in [
+            "LOCUST_LOCUSTFILE",
+            "LOCUST_USERS",
+            "LOCUST_WEB_HOST_DISPLAY_NAME",
+            "LOCUST_SKIP_MONKEY_PATCH",
+            "LOCUST_CLOUD",
+            "LOCUST_ENABLE_OPENTELEMETRY",
         ]
+    ]
+
+    locust_args = [
+        {"name": "LOCUST_LOCUSTFILE", "value": ",".join([str(file) for file in locustfiles])},
+        {"name": "LOCUST_FLAGS", "value": " ".join([option for option in locust_options if option != "--cloud"])},
+        {"name": "LOCUST_LOGLEVEL", "value": options.loglevel},
+        {"name": "LOCUSTCLOUD_DEPLOYER_URL", "value": api_url},
+        *locust_env_variables,
+    ]
+
+    if options.otel:
+        locust_args.append({"name": "LOCUST_ENABLE_OPENTELEMETRY", "value": "true"})
+        locust_args.extend(
+            [
+                {"name": env_variable, "value": os.environ[env_variable]}
+                for env_variable in os.environ
+                if env_variable.startswith("OTEL_")
+            ]
+        )
 
-        if options.otel:
-            locust_args.append({"name": "LOCUST_ENABLE_OPENTELEMETRY", "value": "true"})
-            locust_args.extend(
-                [
-                    {"name": env_variable, "value": os.environ[env_variable]}
-                    for env_variable in os.environ
-                    if env_variable.startswith("OTEL_")
-                ]
-            )
+    if options.testrun_tags:
+        locust_args.append({"name": "LOCUSTCLOUD_TESTRUN_TAGS", "value": ",".join(options.testrun_tags)})
 
-        if options.testrun_tags:
-            locust_args.append({"name": "LOCUSTCLOUD_TESTRUN_TAGS", "value": ",".join(options.testrun_tags)})
+    payload = {
+        "locust_args": locust_args,
+        "project_data": project_data,
+    }
 
-        payload = {
-            "locust_args": locust_args,
-            "project_data": project_data,
-        }
+    if options.image_tag is not None:
+        logger.log(
+            logging.DEBUG if options.image_tag in ["master", "latest"] else logging.INFO,
+            f"You have requested image tag {options.image_tag}",
+        )
+        payload["image_tag"] = options.image_tag
+
+    if options.workers is not None:
+        payload["worker_count"] = options.workers
+
+    if options.users:
+        payload["user_count"] = options.users
+        locust_args.append({"name": "LOCUST_USERS", "value": str(options.users)})
+
+    payload.update(dependencies)
+    # Always sent, so any run can reuse load generators kept warm by an earlier one, not only runs with --keep-warm
+    payload["stack_fingerprint"] = stack_fingerprint(payload)
+
+    if options.keep_warm:
+        payload["keep_warm"] = options.keep_warm
+
+    return payload
+
+
+def stack_fingerprint(payload: dict) -> str:
+    """
+    Identifies everything that requires the load generators to be recreated (as opposed
+    to just swapping in a new project archive), so that a warm stack can be reused.
+    """
+    return hashlib.sha256(
+        json.dumps([payload.get("image_tag"), payload.get("worker_count"), payload.get("dependencies_hash")]).encode()
+    ).hexdigest()
+
+
+def deploy(session: ApiSession, payload: dict, local_instance: bool) -> dict | None:
+    """
+    Deploy the load generators, retrying while a previous stack is still terminating.
+    Returns the deployer response, or None if the deployment failed (the error has already been logged).
+    """
+    for attempt in range(1, 16):
+        if local_instance:
+            return {
+                "log_ws_url": f"ws://localhost:1095{os.environ.get('LOCUST_WEB_BASE_PATH', '')}/socket-logs",
+                "session_id": "valid-session-id",
+                "worker_count": 1,
+            }
+        try:
+            response = session.post("/deploy", json=payload)
+            js = response.json()
 
-        if options.image_tag is not None:
-            logger.log(
-                logging.DEBUG if options.image_tag in ["master", "latest"] else logging.INFO,
-                f"You have requested image tag {options.image_tag}",
-            )
-            payload["image_tag"] = options.image_tag
-
-        if options.workers is not None:
-            payload["worker_count"] = options.workers
-
-        if options.users:
-            payload["user_count"] = options.users
-            locust_args.append({"name": "LOCUST_USERS", "value": str(options.users)})
-
-        if options.requirements:
-            payload["requirements"] = options.requirements
-
-        if options.extra_packages:
-            payload["extra_packages"] = options.extra_packages
-
-        for attempt in range(1, 16):
-            if options.local_instance:
-                response = requests.Response()
-                response.status_code = 200
-                js = {
-                    "log_ws_url": f"ws://localhost:1095{os.environ.get('LOCUST_WEB_BASE_PATH', '')}/socket-logs",
-                    "session_id": "valid-session-id",
-                    "worker_count": 1,
-                }
+            if response.status_code != 202:
+                # 202 means the stack is currently terminating, so we retry
                 break
-            try:
-                response = session.post("/deploy", json=payload)
-                js = response.json()
-
-                if response.status_code != 202:
-                    # 202 means the stack is currently terminating, so we retry
-                    break
-
-                if attempt == 1:
-                    logger.info(js["message"])
-
-                time.sleep(2)
-            except requests.exceptions.ConnectionError:
-                logger.error(
-                    "An error occured while trying to connect to the server. Please check your internet connection and try again."
-                )
-                return 1
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Failed to deploy the load generators: {e}")
-                return 1
+
+            if attempt == 1:
+                logger.info(js["message"])
+
+            time.sleep(2)
+        except requests.exceptions.ConnectionError:
+            logger.error(
+                "An error occured while trying to connect to the server. Please check your internet connection and try again."
+            )
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to deploy the load generators: {e}")
+            return None
+    else:
+        logger.error(f"Your Locust instance is still running, run {delete_command(session)}")
+        return None
+
+    if response.status_code != 200:
+        try:
+            logger.error(f"{js['Message']} (HTTP {response.status_code}/{response.reason})")
+        except Exception:
+            logger.error(
+                f"HTTP {response.status_code}/{response.reason} - Response: {response.text} - URL: {response.request.url}"
+            )
+        return None
+
+    return js
+
+
+def attach(session: ApiSession) -> dict | None:
+    """
+    Look up the running test to reattach to.
+    Returns the same fields as deploy, or None if there is nothing to attach to (the error has already been logged).
+    """
+    try:
+        js = session.running_session()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to look up the running test: {e}")
+        return None
+
+    if js is None:
+        logger.error("You have no running test to attach to")
+
+    return js
+
+
+def run(
+    session: ApiSession,
+    payload: dict,
+    options: Namespace,
+    start_time: datetime,
+    prefix: str = "",
+    interactive: bool = True,
+    watch_files: Callable[[], Iterable[pathlib.Path]] | None = None,
+    preflight: Preflight | None = None,
+    log_file: LogFile | None = None,
+    on_deployed: Callable[[str], None] | None = None,
+) -> int | None:
+    """
+    Deploy the load generators (or attach to the running ones), stream their logs until the test is done and tear everything down.
+    on_deployed is called with the session id as soon as it is known.
+    """
+    reducer = None
+    if options.collapse_logs or options.max_log_rate:
+        reducer = LogReducer(window=options.collapse_logs or 0, max_rate=options.max_log_rate)
+    websocket = Websocket(
+        prefix=prefix,
+        reducer=reducer,
+        log_file=log_file,
+        terminal_level=getattr(logging, options.terminal_loglevel) if options.terminal_loglevel else logging.NOTSET,
+    )
+    input_listener = None
+    controls = None
+    watcher = None
+    session_id = None
+
+    try:
+        if options.attach is not None:
+            logger.info(f"Attaching to running test ({session.region}, locust-cloud {__version__})")
+            js = attach(session)
         else:
-            logger.error("Your Locust instance is still running, run locust --delete")
+            logger.info(f"Deploying ({session.region}, locust-cloud {__version__})")
+            js = deploy(session, payload, options.local_instance)
+        if js is None:
             return 1
 
-        if response.status_code != 200:
-            try:
-                logger.error(f"{js['Message']} (HTTP {response.status_code}/{response.reason})")
-            except Exception:
-                logger.error(
-                    f"HTTP {response.status_code}/{response.reason} - Response: {response.text} - URL: {response.request.url}"
-                )
+        if preflight and (error := preflight.wait()):
+            logger.error(f"Preflight check failed, stopping the deployment:\n{error}")
+            session.teardown("PreflightFailed", session_id=js["session_id"])
             return 1
 
+        if js.get("reattached"):
+            logger.info("Reusing warm load generators, only the project files were updated")
+
         log_ws_url = js["log_ws_url"]
         session_id = js["session_id"]
+        if on_deployed:
+            on_deployed(session_id)
+
+        if interactive:
 
-        def open_ui():
-            extrasubdomain = ".dev." if "api-dev" in session.api_url else "."
-            webbrowser.open_new_tab(f"https://auth{extrasubdomain}locust.cloud/load-test")
+            def open_ui():
+                extrasubdomain = ".dev." if "api-dev" in session.api_url else "."
+                webbrowser.open_new_tab(f"https://auth{extrasubdomain}locust.cloud/load-test")
 
-        Thread(target=input_listener({"\r": open_ui, "\n": open_ui}), daemon=True).start()
+            controls = RuntimeControls(websocket, users_step=max(1, options.users // 10) if options.users else 10)
+            input_listener = InputListener({"\r": open_ui, "\n": open_ui, **controls.bindings})
+            Thread(target=input_listener.run, daemon=True).start()
 
         # logger.debug(f"Session ID is {session_id}")
 
         logger.info(f"Waiting for load generators ({js['worker_count']} workers) to be ready...")
+        if not options.local_instance and wait_until_ready(session, session_id):
+            # The master is known to be up, so there is no need to allow for slow startups
+            websocket.initial_connect_timeout = READY_CONNECT_TIMEOUT
         websocket.connect(
             log_ws_url,
             auth=session_id,
         )
-        websocket.sio.emit("subscribe")
+        websocket.subscribe(options.attach)
         logger.debug(f"SocketIO transport type: {websocket.sio.transport()}")
+        if watch_files:
+            watcher = ProjectWatcher(
+                watch_files,
+                lambda changed, deleted: push_project_update(websocket, changed, deleted, options.precompile),
+            )
+            Thread(target=watcher.run, daemon=True).start()
+            logger.info("Watching the project files for changes")
+        if controls and sys.stdin.isatty():
+            logger.info(f"Press Enter to open the web UI, {controls.help()}")
         websocket.wait()
 
     except KeyboardInterrupt:
         logger.debug("Interrupted by user")
+        if options.attach is not None:
+            # The test wasn't started by this invocation, so only stop following it
+            return detach(session, websocket, options.attach)
         if options.local_instance:
             os.system("pkill -TERM -f bootstrap")
         else:
-            session.teardown("KeyboardInterrupt")
+            session.teardown("KeyboardInterrupt", session_id=session_id)
         try:
             websocket.wait(timeout=True)
         except (WebsocketTimeout, SessionMismatchError) as e:
@@ -210,10 +364,20 @@ def main(locustfiles: list[str] | None = None):
             return 1
     except WebsocketTimeout as e:
         logger.error(str(e))
+        if options.attach is not None:
+            detach(session, websocket, options.attach)
+            return 1
         if (datetime.now() - start_time).total_seconds() < 300:
-            session.teardown("WebsocketTimeout", debug_info=engineio_handler.logs)
+            session.teardown("WebsocketTimeout", debug_info=engineio_handler.logs, session_id=session_id)
         else:
-            session.teardown("IdleTimeout")
+            session.teardown("IdleTimeout", session_id=session_id)
+        return 1
+    except ReadinessError as e:
+        logger.error(str(e))
+        if options.attach is not None:
+            detach(session, websocket, options.attach)
+            return 1
+        session.teardown("ReadinessError", session_id=session_id)
         return 1
     except SessionMismatchError as e:
         # In this case we do not trigger the teardown since the running instance is not ours
@@ -221,7 +385,354 @@ def main(locustfiles: list[str] | None = None):
         return 1
     except Exception as e:
         logger.exception(e)
-        session.teardown(f"Exception {e}")
+        if options.attach is not None:
+            detach(session, websocket, options.attach)
+            return 1
+        session.teardown(f"Exception {e}", session_id=session_id)
         return 1
     else:
-        session.teardown("Shutdown")
+        artifacts_downloaded = True
+        if options.output_dir and session_id:
+            artifacts_downloaded = download_artifacts(session, session_id, options.output_dir)
+
+        if options.keep_warm:
+            logger.info(
+                f"Keeping load generators warm for {options.keep_warm} minutes. Run {delete_command(session)} to tear them down now."
+            )
+        else:
+            session.teardown("Shutdown", session_id=session_id)
+
+        if not artifacts_downloaded:
+            return 1
+    finally:
+        if websocket.last_event_id:
+            logger.debug(f"Last log event id was {websocket.last_event_id}")
+        if input_listener:
+            input_listener.stop()
+        if watcher:
+            watcher.stop()
+
+
+def detach(session: ApiSession, websocket: Websocket, cursor: int) -> int:
+    """
+    Stop following a test that was reattached to, leaving it running.
+    It is only stopped on an explicit request, like the q control or locust --delete.
+    """
+    websocket.shutdown()
+    command = attach_command(session, max(cursor, websocket.last_event_id))
+    logger.info(
+        f"Detached, the test is still running. Run {command} to follow it again, or {delete_command(session)} to stop it."
+    )
+    return 0
+
+
+def attach_command(session: ApiSession, cursor: int = 0) -> str:
+    command = "locust --attach"
+    if cursor:
+        command += f" {cursor}"
+    if session.region in VALID_REGIONS:
+        command += f" --region {session.region}"
+    return command
+
+
+def start_preflight(
+    options: Namespace, locustfiles: list[pathlib.Path], extra_files: list[pathlib.Path] | None = None
+) -> Preflight | None:
+    if not options.preflight:
+        return None
+
+    files = project_files(locustfiles, (options.extra_files or []) if extra_files is None else extra_files)
+    files = expanded(files, ignore_rules=IgnoreRules.from_files())
+    return Preflight(locustfiles, files, import_check=options.preflight_import).start()
+
+
+def connect_agent(options: Namespace) -> AgentClient | None:
+    if options.no_agent or options.dry_run or options.local_instance:
+        return None
+
+    agent = AgentClient.connect()
+    if agent:
+        logger.debug(f"Using the agent at {agent.path}")
+    return agent
+
+
+def selected_region(options: Namespace) -> str | None:
+    """
+    The region to use when running in a single region, None meaning the one you logged in to.
+    """
+    if options.regions:
+        return options.regions[0]
+    if options.region == "auto":
+        return nearest_region()
+    return options.region
+
+
+def delete(options: Namespace) -> None:
+    """
+    Tear down the load generators in every region given with --region or --regions,
+    or in the one you logged in to.
+    """
+    for region in options.regions or [selected_region(options)]:
+        ApiSession(options.non_interactive, region=region).teardown("--delete")
+
+
+def delete_command(session: ApiSession) -> str:
+    if session.region in VALID_REGIONS:
+        return f"locust --delete --region {session.region}"
+    return "locust --delete"
+
+
+def create_session(options: Namespace, region: str | None = None, agent: AgentClient | None = None) -> ApiSession:
+    if options.dry_run:
+        deployer = LocalDeployer()
+        deployer.start()
+        return LocalApiSession(deployer)
+
+    if agent:
+        try:
+            return AgentApiSession(agent, options.non_interactive, region=region)
+        except AgentError as e:
+            logger.debug(f"Could not get a token from the agent: {e}")
+
+    return ApiSession(options.non_interactive, region=region)
+
+
+def main(locustfiles: list[str] | None = None):
+    start_time = datetime.now()
+    options, locust_options = combined_cloud_parser.parse_known_args()
+
+    configure_logging(options.loglevel)
+    # Shared by all the tests started by this invocation, closed when the CLI exits
+    log_file = LogFile(options.log_file).start() if options.log_file else None
+
+    if options.region and options.regions:
+        logger.error("--region can not be combined with --regions")
+        return 1
+
+    if options.dry_run and not WebSocketHandler:
+        logger.error(MISSING_DEPENDENCY)
+        return 1
+
+    if options.login:
+        web_login.web_login(selected_region(options) or "us-east-1")
+        return
+
+    if options.delete:
+        return delete(options)
+
+    if options.batch:
+        return main_batch(options, locust_options, log_file)
+
+    if options.attach is not None:
+        return run(create_session(options, region=selected_region(options)), {}, options, start_time, log_file=log_file)
+
+    if not locustfiles:
+        logger.error("A locustfile is required to run a test.")
+        return 1
+
+    try:
+        relative_locustfiles: list[pathlib.Path] = [valid_project_path(locustfile) for locustfile in locustfiles]
+    except ArgumentTypeError as e:
+        logger.error(e)
+        return
+
+    if options.calibrate:
+        apply_calibration(options, relative_locustfiles)
+
+    if options.shard_files and (not options.workers or (options.regions and len(options.regions) > 1)):
+        logger.error("--shard-files requires --workers, and can not be combined with more than one region")
+        return 1
+
+    if options.regions and len(options.regions) > 1:
+        return main_regions(options, locust_options, relative_locustfiles, log_file)
+
+    preflight = start_preflight(options, relative_locustfiles)
+    agent = connect_agent(options)
+    session = create_session(options, region=selected_region(options), agent=agent)
+    try:
+        project_data = package_project(
+            relative_locustfiles, options.extra_files or [], options.max_project_size, options.precompile, agent
+        )
+    except ProjectTooLarge as e:
+        logger.error(e)
+        return 1
+
+    dependencies = resolve_dependencies(session, options.requirements, options.extra_packages or [])
+    payload = build_payload(options, locust_options, relative_locustfiles, project_data, dependencies, session.api_url)
+    if options.shard_files:
+        try:
+            payload.update(upload_shards(session, list(expanded(options.shard_files)), options.workers))
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to upload the shards: {e}")
+            return 1
+
+    def watch_files() -> set[pathlib.Path]:
+        files = project_files(relative_locustfiles, options.extra_files or [])
+        return set(expanded(files, ignore_rules=IgnoreRules.from_files()))
+
+    return run(
+        session,
+        payload,
+        options,
+        start_time,
+        watch_files=watch_files if options.watch else None,
+        preflight=preflight,
+        log_file=log_file,
+    )
+
+
+def apply_calibration(options: Namespace, locustfiles: list[pathlib.Path]) -> None:
+    result = calibrate(locustfiles, options.calibrate)
+    if result is None:
+        return
+
+    message = f"Calibration: {result.cpu_per_user * 1000:.1f} ms CPU per user per second"
+    if result.requests:
+        # Only HTTP requests reach the stand-in target, so other kinds of users don't have a request rate
+        message += f", {result.requests_per_core_second:.0f} HTTP requests per core second"
+    logger.info(message)
+    if result.cpu_utilization > 0.9:
+        logger.warning(
+            "The calibration run was CPU bound, so the real cost per user is probably higher. Consider adding a wait_time to your users."
+        )
+
+    if not options.users:
+        return
+
+    workers = recommended_workers(result, options.users)
+    if options.workers is None:
+        logger.info(f"Using {workers} workers for {options.users} users")
+        options.workers = workers
+    elif options.workers != workers:
+        logger.info(
+            f"Calibration suggests {workers} workers for {options.users} users (you asked for {options.workers})"
+        )
+
+
+def main_regions(
+    options: Namespace, locust_options: list[str], locustfiles: list[pathlib.Path], log_file: LogFile | None = None
+) -> int | None:
+    """
+    Run the same test from several regions at once, packaging the project only once
+    and splitting the users and workers between the regions.
+    """
+    for name, total in [("--users", options.users), ("--workers", options.workers)]:
+        if total and total < len(options.regions):
+            logger.error(f"{name} ({total}) must be at least the number of regions ({len(options.regions)})")
+            return 1
+
+    preflight = start_preflight(options, locustfiles)
+    agent = connect_agent(options)
+    try:
+        project_data = package_project(
+            locustfiles, options.extra_files or [], options.max_project_size, options.precompile, agent
+        )
+    except ProjectTooLarge as e:
+        logger.error(e)
+        return 1
+
+    sessions = {region: create_session(options, region=region, agent=agent) for region in options.regions}
+    users = split_evenly(options.users, len(options.regions)) if options.users else None
+    workers = split_evenly(options.workers, len(options.regions)) if options.workers else None
+    session_ids: dict[str, str] = {}
+    start_time = datetime.now()
+
+    def run_region(region: str) -> int | None:
+        session = sessions[region]
+        region_options = Namespace(**vars(options))
+        index = options.regions.index(region)
+        if users:
+            region_options.users = users[index]
+        if workers:
+            region_options.workers = workers[index]
+
+        def deployed(session_id: str) -> None:
+            session_ids[region] = session_id
+
+        dependencies = resolve_dependencies(session, options.requirements, options.extra_packages or [])
+        payload = build_payload(
+            region_options, locust_options, locustfiles, project_data, dependencies, session.api_url
+        )
+        return run(
+            session,
+            payload,
+            region_options,
+            start_time,
+            prefix=region,
+            interactive=False,
+            preflight=preflight,
+            log_file=log_file,
+            on_deployed=deployed,
+        )
+
+    def stop_region(region: str) -> None:
+        sessions[region].teardown(
+            "Stopped because the test failed in another region", session_id=session_ids.get(region)
+        )
+
+    try:
+        return run_regions(options.regions, run_region, stop_region)
+    except KeyboardInterrupt:
+        for region, session in sessions.items():
+            session.teardown("KeyboardInterrupt", session_id=session_ids.get(region))
+        return 1
+
+
+def main_batch(options: Namespace, locust_options: list[str], log_file: LogFile | None = None) -> int | None:
+    """
+    Run all scenarios from a batch plan using a single authenticated session
+    and a single project archive shared between all of them.
+    """
+    if options.shard_files:
+        logger.error("--shard-files can not be used with --batch")
+        return 1
+
+    try:
+        plan = load_batch_plan(options.batch)
+    except ArgumentTypeError as e:
+        logger.error(e)
+        return 1
+
+    agent = connect_agent(options)
+    session = create_session(options, region=selected_region(options), agent=agent)
+
+    locustfiles = list(dict.fromkeys(lf for scenario in plan.scenarios for lf in scenario.locustfiles))
+    extra_files = list(
+        dict.fromkeys((options.extra_files or []) + [p for scenario in plan.scenarios for p in scenario.extra_files])
+    )
+    # One check for the whole plan, which every scenario waits for after deploying
+    preflight = start_preflight(options, locustfiles, extra_files)
+    try:
+        project_data = package_project(locustfiles, extra_files, options.max_project_size, options.precompile, agent)
+    except ProjectTooLarge as e:
+        logger.error(e)
+        return 1
+    dependencies = resolve_dependencies(session, options.requirements, options.extra_packages or [])
+
+    def run_scenario(scenario: Scenario) -> int | None:
+        scenario_options = Namespace(**vars(options))
+        if scenario.users is not None:
+            scenario_options.users = scenario.users
+        if scenario.workers is not None:
+            scenario_options.workers = scenario.workers
+
+        payload = build_payload(
+            scenario_options,
+            locust_options + scenario.args,
+            scenario.locustfiles,
+            project_data,
+            dependencies,
+            session.api_url,
+        )
+        return run(
+            session,
+            payload,
+            scenario_options,
+            datetime.now(),
+            prefix=scenario.name if plan.parallel > 1 else "",
+            interactive=False,
+            preflight=preflight,
+            log_file=log_file,
+        )
+
+    return run_batch(plan, run_scenario)
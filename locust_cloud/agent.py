@@ -0,0 +1,308 @@
+"""
+An optional background process that keeps state between runs of the CLI on the same machine,
+which is useful on CI hosts that start many tests:
+
+    locust-cloud-agent &
+
+While it is running, `locust --cloud` gets its (already refreshed) authentication token from the agent
+instead of logging in, and lets the agent package the project, reusing the import graph and archives
+of earlier runs for files that haven't changed. Pass --no-agent to bypass it.
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import platformdirs
+from locust_cloud.apisession import ApiSession
+from locust_cloud.args import ProjectTooLarge, expanded, zip_project_paths
+from locust_cloud.common import __version__
+from locust_cloud.ignore import IgnoreRules
+
+logger = logging.getLogger(__name__)
+
+# How many packaged projects to keep
+PACKAGE_CACHE_SIZE = 8
+
+
+def socket_path() -> Path:
+    return Path(
+        os.environ.get("LOCUSTCLOUD_AGENT_SOCKET")
+        or Path(platformdirs.user_runtime_dir(appname="locust-cloud")) / "agent.sock"
+    )
+
+
+def credentials_fingerprint() -> str:
+    """
+    Identifies the non-interactive credentials in the environment, without revealing them,
+    so the agent only hands out tokens to clients that have the same credentials as itself.
+    """
+    credentials = [os.getenv(name) or "" for name in ("LOCUSTCLOUD_USERNAME", "LOCUSTCLOUD_PASSWORD")]
+    return hashlib.sha256("\0".join(credentials).encode()).hexdigest()
+
+
+def in_directory(module: ModuleType, directory: str) -> bool:
+    """
+    True if the module (or for a namespace package, any part of it) was loaded from the directory.
+    """
+    paths = [module.__file__] if getattr(module, "__file__", None) else list(getattr(module, "__path__", []))
+    return any(Path(path).resolve().is_relative_to(Path(directory).resolve()) for path in paths if path)
+
+
+class AgentError(Exception):
+    pass
+
+
+class AgentClient:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @classmethod
+    def connect(cls) -> "AgentClient | None":
+        """
+        Returns a client if an agent of the same version is running, None otherwise.
+        """
+        if not hasattr(socket, "AF_UNIX") or not socket_path().exists():
+            return None
+
+        client = cls(socket_path())
+        try:
+            version = client.call("ping")["version"]
+        except (AgentError, OSError) as e:
+            logger.debug(f"Not using the agent: {e}")
+            return None
+
+        if version != __version__:
+            logger.debug(f"Not using the agent, it is version {version}")
+            return None
+
+        return client
+
+    def call(self, op: str, **kwargs) -> dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(self.path))
+            with sock.makefile("rwb") as f:
+                f.write(json.dumps({"op": op, **kwargs}).encode() + b"\n")
+                f.flush()
+                line = f.readline()
+
+        if not line:
+            raise AgentError("The agent closed the connection")
+
+        response = json.loads(line)
+        if response.get("type") == "ProjectTooLarge":
+            raise ProjectTooLarge(response["error"])
+        if "error" in response:
+            raise AgentError(response["error"])
+
+        return response
+
+    def token(self, non_interactive: bool, region: str | None) -> dict:
+        return self.call(
+            "token",
+            non_interactive=non_interactive,
+            region=region,
+            credentials=credentials_fingerprint() if non_interactive else None,
+        )
+
+    def package(self, locustfiles: list[Path], extra_files: list[Path], max_size_mb: int | None, precompile: bool):
+        return self.call(
+            "package",
+            cwd=os.getcwd(),
+            locustfiles=[str(path) for path in locustfiles],
+            extra_files=[str(path) for path in extra_files],
+            max_size_mb=max_size_mb,
+            precompile=precompile,
+        )["project_data"]
+
+
+class AgentApiSession(ApiSession):
+    """
+    An ApiSession that gets its token from the agent, which takes care of logging in and refreshing it.
+    """
+
+    def __init__(self, agent: AgentClient, non_interactive: bool, region: str | None = None) -> None:
+        self.__agent = agent
+        super().__init__(non_interactive, region=region)
+
+    def login(self, region: str | None) -> None:
+        self.__requested_region = region
+        self.__update_token()
+
+    def authorization(self) -> tuple[str, int]:
+        if self.__id_token_expires <= time.time():
+            self.__update_token()
+        return self.headers["Authorization"].removeprefix("Bearer "), self.__id_token_expires
+
+    def __update_token(self) -> None:
+        token = self.__agent.token(self.non_interactive, self.__requested_region)
+        self.region = token["region"]
+        self.api_url = token["api_url"]
+        self.__id_token_expires = token["id_token_expires"]
+        self.headers["Authorization"] = f"Bearer {token['id_token']}"
+
+
+class Agent:
+    """
+    Answers requests from the CLI, see AgentClient.
+    """
+
+    def __init__(self, project_files: Callable[[list[Path], list[Path]], set[Path]]) -> None:
+        self.project_files = project_files
+        self.__sessions: dict[tuple[bool, str | None], ApiSession] = {}
+        self.__packages: OrderedDict[str, dict[str, str]] = OrderedDict()
+        self.__session_lock = threading.Lock()
+        # Packaging needs to change the working directory and sys.path, which are global
+        self.__package_lock = threading.Lock()
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"version": __version__}
+        elif op == "token":
+            return self.token(request)
+        elif op == "package":
+            return self.package(request)
+        else:
+            return {"error": f"Unknown operation {op}"}
+
+    def token(self, request: dict) -> dict:
+        non_interactive = request["non_interactive"]
+        if non_interactive and request["credentials"] != credentials_fingerprint():
+            return {"error": "The agent was started with different credentials"}
+
+        key = (non_interactive, request["region"])
+        with self.__session_lock:
+            if key not in self.__sessions:
+                try:
+                    self.__sessions[key] = ApiSession(non_interactive, region=request["region"])
+                except SystemExit:
+                    return {"error": "Authentication failed"}
+            session = self.__sessions[key]
+            try:
+                id_token, id_token_expires = session.authorization()
+            except SystemExit:
+                del self.__sessions[key]
+                return {"error": "Authentication failed"}
+
+        return {
+            "id_token": id_token,
+            "id_token_expires": id_token_expires,
+            "region": session.region,
+            "api_url": session.api_url,
+        }
+
+    def package(self, request: dict) -> dict:
+        with self.__package_lock:
+            previous_cwd = os.getcwd()
+            previous_modules = set(sys.modules)
+            os.chdir(request["cwd"])
+            sys.path.insert(0, request["cwd"])
+            importlib.invalidate_caches()
+            try:
+                files = self.project_files(
+                    [Path(path) for path in request["locustfiles"]], [Path(path) for path in request["extra_files"]]
+                )
+                # The archive can be reused as long as none of the files in it have changed
+                contents = sorted(
+                    (str(path), stat.st_mtime_ns, stat.st_size)
+                    for path in expanded(files, ignore_rules=IgnoreRules.from_files())
+                    for stat in [path.stat()]
+                )
+                key = hashlib.sha256(json.dumps([request, contents], sort_keys=True).encode()).hexdigest()
+
+                if key in self.__packages:
+                    logger.debug(f"Reusing the packaged project in {request['cwd']}")
+                    self.__packages.move_to_end(key)
+                else:
+                    logger.debug(f"Packaging the project in {request['cwd']}")
+                    self.__packages[key] = zip_project_paths(
+                        files, max_size_mb=request["max_size_mb"], precompile=request["precompile"]
+                    )
+                    while len(self.__packages) > PACKAGE_CACHE_SIZE:
+                        self.__packages.popitem(last=False)
+
+                return {"project_data": self.__packages[key]}
+            except ProjectTooLarge as e:
+                return {"error": str(e), "type": "ProjectTooLarge"}
+            except (OSError, SyntaxError) as e:
+                return {"error": str(e)}
+            finally:
+                # Forget the project's own modules that were imported while looking for its modules,
+                # so the next request sees their changes. Anything else (like installed packages) is kept.
+                for name in set(sys.modules) - previous_modules:
+                    if in_directory(sys.modules[name], request["cwd"]):
+                        del sys.modules[name]
+                sys.path.remove(request["cwd"])
+                os.chdir(previous_cwd)
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        assert isinstance(self.server, AgentServer)  # typing...
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            response = self.server.agent.handle(json.loads(line))
+        except Exception as e:
+            logger.exception(e)
+            response = {"error": f"{e.__class__.__name__}: {e}"}
+
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, agent: Agent) -> None:
+        self.agent = agent
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        # Only the current user may talk to the agent, since it hands out their tokens
+        previous_umask = os.umask(0o077)
+        try:
+            super().__init__(str(path), AgentRequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+
+def main() -> None:
+    # Importing this at the top would be circular, the CLI imports this module
+    from locust_cloud import configure_logging, project_files
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loglevel", "-L", type=str.upper, default="INFO", choices=["DEBUG", "INFO", "WARNING"])
+    args = parser.parse_args()
+    configure_logging(args.loglevel)
+
+    if not hasattr(socket, "AF_UNIX"):
+        logger.error("The agent is not supported on this platform")
+        sys.exit(1)
+
+    path = socket_path()
+    if AgentClient.connect():
+        logger.error(f"An agent is already listening on {path}")
+        sys.exit(1)
+
+    with AgentServer(path, Agent(project_files)) as server:
+        logger.info(f"Agent listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
@@ -12,14 +12,24 @@ unauthorized_message = "You need to log in again. Please run:\n    locust --logi
 
 
 class ApiSession(requests.Session):
-    def __init__(self, non_interactive: bool) -> None:
+    def __init__(self, non_interactive: bool, region: str | None = None) -> None:
+        """
+        The region defaults to the one you logged in to (or LOCUSTCLOUD_REGION when non-interactive).
+        """
         super().__init__()
         self.non_interactive = non_interactive
-
-        if non_interactive:
+        self.headers["X-Client-Version"] = __version__
+        self.login(region)
+
+    def login(self, region: str | None) -> None:
+        """
+        Get an id token, setting the region, api_url and Authorization header.
+        Subclasses getting their token some other way override this and authorization().
+        """
+        if self.non_interactive:
             username = os.getenv("LOCUSTCLOUD_USERNAME")
             password = os.getenv("LOCUSTCLOUD_PASSWORD")
-            region = os.getenv("LOCUSTCLOUD_REGION")
+            region = region or os.getenv("LOCUSTCLOUD_REGION")
 
             if not all([username, password, region]):
                 print(
@@ -52,8 +62,9 @@ class ApiSession(requests.Session):
                 print(unauthorized_message)
                 sys.exit(1)
 
-            assert config.region
-            self.__configure_for_region(config.region)
+            region = region or config.region
+            assert region
+            self.__configure_for_region(region)
             id_token = config.id_token
             user_sub_id = config.user_sub_id
             refresh_token = config.refresh_token
@@ -63,7 +74,6 @@ class ApiSession(requests.Session):
         self.__refresh_token = refresh_token
         self.__id_token_expires = id_token_expires - 60  # Refresh 1 minute before expiry
         self.headers["Authorization"] = f"Bearer {id_token}"
-        self.headers["X-Client-Version"] = __version__
 
     def __configure_for_region(self, region: str) -> None:
         self.region = region
@@ -105,14 +115,35 @@ class ApiSession(requests.Session):
             config.id_token_expires = id_token_expires
             write_cloud_config(config)
 
-    def request(self, method, url, *args, **kwargs) -> requests.Response:
+    def authorization(self) -> tuple[str, int]:
+        """
+        Returns the current id token and when it should be refreshed, after refreshing it if needed.
+        """
         self.__ensure_valid_authorization_header()
+        return self.headers["Authorization"].removeprefix("Bearer "), self.__id_token_expires
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        self.authorization()
         return super().request(method, f"{self.api_url}{url}", *args, **kwargs)
 
-    def teardown(self, reason, debug_info=None):
+    def running_session(self) -> dict | None:
+        """
+        Look up the test currently running for this user, returning the same fields as a deploy
+        (log_ws_url, session_id and worker_count) or None if nothing is running.
+        """
+        response = self.get("/sessions/current")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def teardown(self, reason, debug_info=None, session_id=None):
         try:
             logger.info("Tearing down Locust cloud...")
-            response = self.post("/teardown", json={"reason": reason, "debug_info": debug_info})
+            payload = {"reason": reason, "debug_info": debug_info}
+            if session_id:
+                payload["session_id"] = session_id
+            response = self.post("/teardown", json=payload)
             if response.status_code == 200:
                 logger.debug(f"Response message from teardown: {response.json()['message']}")
             else:
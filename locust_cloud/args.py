@@ -1,16 +1,18 @@
 import argparse
 import base64
-import gzip
+import importlib.util
 import io
+import logging
 import os
-import shutil
+import py_compile
 import sys
 import tempfile
+import zlib
 from pathlib import Path
 
-from locust_cloud.apisession import ApiSession
-from locust_cloud.common import delete_cloud_config
-from locust_cloud.web_login import web_login
+from locust_cloud.common import VALID_REGIONS, delete_cloud_config
+from locust_cloud.ignore import IgnoreRules
+from locust_cloud.log_file import zstandard
 
 if sys.version_info >= (3, 11):
     import tomllib
@@ -20,11 +22,16 @@ else:
 from argparse import ArgumentTypeError
 from collections import OrderedDict
 from collections.abc import Generator, Iterable
-from typing import IO, Any, cast
-from zipfile import ZipFile
+from typing import IO, Any
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
 
 import configargparse
 
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 3 * 1024 * 1024
+SPOOL_SIZE = 32 * 1024 * 1024
+
 
 class LocustTomlConfigParser(configargparse.TomlConfigParser):
     def parse(self, stream: IO[str]) -> OrderedDict[str, Any]:
@@ -62,6 +69,15 @@ def valid_project_path(path: str | Path) -> Path:
         raise ArgumentTypeError(f"{path!r} is not under current working directory: {Path.cwd()}")
 
 
+def valid_requirements_path(file_path: str) -> Path:
+    p = Path(file_path)
+
+    if not p.is_file():
+        raise ArgumentTypeError(f"File not found: {file_path}")
+
+    return p
+
+
 def valid_extra_packages_path(file_path: str) -> Path:
     p = Path(file_path).resolve()
 
@@ -73,10 +89,69 @@ def valid_extra_packages_path(file_path: str) -> Path:
     return p
 
 
-def transfer_encode(file_name: str, stream: IO[bytes]) -> dict[str, str]:
+def valid_regions(value: str) -> list[str]:
+    regions = list(dict.fromkeys(region.strip() for region in value.split(",") if region.strip()))
+
+    if not regions:
+        raise ArgumentTypeError("At least one region is required")
+    for region in regions:
+        if region not in VALID_REGIONS:
+            raise ArgumentTypeError(f"Unknown region '{region}' (must be one of {', '.join(VALID_REGIONS)})")
+
+    return regions
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid int value: {value!r}")
+
+    if number < 1:
+        raise ArgumentTypeError(f"must be at least 1, got {number}")
+
+    return number
+
+
+def valid_log_file(path: str) -> Path:
+    if path.endswith(".zst") and not zstandard:
+        raise ArgumentTypeError(
+            'Writing .zst log files requires the zstandard package (pip install "locust-cloud[zstd]")'
+        )
+
+    log_path = Path(path)
+    if log_path.is_dir():
+        raise ArgumentTypeError(f"{path!r} is a directory")
+    if not log_path.parent.is_dir():
+        raise ArgumentTypeError(f"Directory not found: {log_path.parent}")
+    if not os.access(log_path if log_path.exists() else log_path.parent, os.W_OK):
+        raise ArgumentTypeError(f"{path!r} is not writable")
+
+    return log_path
+
+
+def transfer_encode(file_name: str, stream: IO[bytes], compresslevel: int = 9) -> dict[str, str]:
+    """
+    Gzip and base64 encode the stream chunk by chunk into a single text buffer, so apart from
+    the chunk being worked on, memory use peaks at about two copies of the encoded result
+    (the buffer and the returned string) while getvalue() runs.
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    encoded = io.StringIO()
+    pending = b""
+
+    while chunk := stream.read(CHUNK_SIZE):
+        pending += compressor.compress(chunk)
+        # base64 encoding in multiples of 3 bytes concatenates without padding
+        cut = len(pending) - len(pending) % 3
+        encoded.write(base64.b64encode(pending[:cut]).decode())
+        pending = pending[cut:]
+
+    encoded.write(base64.b64encode(pending + compressor.flush()).decode())
+
     return {
         "filename": file_name,
-        "data": bytes.decode(base64.b64encode(gzip.compress(stream.read()))),
+        "data": encoded.getvalue(),
     }
 
 
@@ -88,76 +163,180 @@ def transfer_encoded_file(file_path: str) -> dict[str, str]:
         raise ArgumentTypeError(f"File not found: {file_path}")
 
 
-def expanded(paths: Iterable[Path], skip_folders: list[str] = []) -> Generator[Path, None, None]:
+def compress_type_for(path: Path) -> int:
+    if path.suffix == ".whl" or path.suffixes[-2:] == [".tar", ".gz"]:
+        return ZIP_STORED
+
+    return ZIP_DEFLATED
+
+
+def expanded(
+    paths: Iterable[Path], ignore_rules: IgnoreRules | None = None, skipped: list[Path] | None = None
+) -> Generator[Path, None, None]:
+    """
+    Yield the given files, and all files in the given directories. Ignored directories are
+    pruned without being traversed, and what was left out is appended to skipped.
+    Paths that were explicitly given are always included: rules are matched relative to the
+    directory being expanded, so that a rule excluding that directory doesn't empty it.
+    """
     for path in paths:
         path = Path(path)
 
         if path.is_dir():
-            for root, _, file_names in os.walk(path):
-                if root.split("/")[-1] in skip_folders:
-                    continue
+            for root, dir_names, file_names in os.walk(path):
+                root_path = Path(root)
+                relative_root = root_path.relative_to(path)
+                if ignore_rules:
+                    for dir_name in list(dir_names):
+                        if ignore_rules.is_ignored(relative_root / dir_name, is_dir=True):
+                            dir_names.remove(dir_name)
+                            if skipped is not None:
+                                skipped.append(root_path / dir_name)
                 for file_name in file_names:
-                    yield Path(root) / file_name
+                    file_path = root_path / file_name
+                    if ignore_rules and ignore_rules.is_ignored(relative_root / file_name):
+                        if skipped is not None:
+                            skipped.append(file_path)
+                    else:
+                        yield file_path
         else:
             yield path
 
 
-def zip_project_paths(paths: Iterable[Path], to_file: str = "project"):
+# Projects larger than this are warned about, unless a --max-project-size is given
+PROJECT_SIZE_WARNING_MB = 100
+
+
+class ProjectTooLarge(Exception):
+    pass
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def check_project_size(files: Iterable[Path], max_size_mb: int | None) -> None:
+    """
+    Report what is about to be uploaded, and fail before spending any time
+    compressing it if it is larger than the budget. Without a budget, a large project is only warned about.
+    """
+    sizes = {path: path.stat().st_size for path in files}
+    total = sum(sizes.values())
+    logger.debug(f"Project contains {len(sizes)} files, {format_size(total)} in total")
+
+    limit_mb = max_size_mb or PROJECT_SIZE_WARNING_MB
+    if total <= limit_mb * 1024 * 1024:
+        return
+
+    largest = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:5]
+    largest_files = "\n".join(f"    {format_size(size)} {path}" for path, size in largest)
+    if max_size_mb:
+        raise ProjectTooLarge(
+            f"Project files are {format_size(total)}, which is more than the limit of {max_size_mb} MB. Largest files:\n"
+            + largest_files
+            + "\nExclude files using .gitignore/.locustcloudignore or raise the limit with --max-project-size"
+        )
+
+    logger.warning(
+        f"Project files are {format_size(total)}, uploading them may take a while. Largest files:\n"
+        + largest_files
+        + "\nExclude files using .gitignore/.locustcloudignore, or use --max-project-size to fail instead"
+    )
+
+
+def write_bytecode(zf: ZipFile, files: Iterable[Path]) -> None:
+    """
+    Add compiled bytecode for the Python files, next to them in __pycache__ like Python itself would.
+    The pycs are unchecked-hash based, so they are used without looking at the source at all.
+    That is only safe because the archive is always built from scratch, so they can't go stale.
+    They are compiled with the local interpreter, and a worker running a different Python version
+    ignores them.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cfile = os.path.join(tmpdir, "module.pyc")
+        for path in files:
+            if path.suffix != ".py":
+                continue
+            try:
+                py_compile.compile(
+                    str(path),
+                    cfile=cfile,
+                    doraise=True,
+                    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+                )
+            except py_compile.PyCompileError as e:
+                logger.debug(f"Not precompiling {path}: {e.msg}")
+                continue
+            zf.write(cfile, arcname=importlib.util.cache_from_source(str(path)))
+
+
+def zip_project_paths(
+    paths: Iterable[Path], to_file: str = "project", max_size_mb: int | None = None, precompile: bool = False
+):
     buffer = io.BytesIO()
-    skip_folders = ["__pycache__"]
+    skipped: list[Path] = []
+    files = set(expanded(paths, ignore_rules=IgnoreRules.from_files(), skipped=skipped))
+    if skipped:
+        logger.info(
+            f"Not uploading {len(skipped)} files/directories matching the ignore rules: "
+            + ", ".join(str(path) for path in skipped[:5])
+            + (", ..." if len(skipped) > 5 else "")
+        )
+        for path in skipped:
+            logger.debug(f"Not uploading {path}, it matches the ignore rules")
+    check_project_size(files, max_size_mb)
 
     with ZipFile(buffer, "w") as zf:
-        for path in set(expanded(paths, skip_folders=skip_folders)):
+        for path in files:
             zf.write(path)
 
+        if precompile:
+            write_bytecode(zf, files)
+
     buffer.seek(0)
     return transfer_encode(f"{to_file}.zip", buffer)
 
 
-def flat_transfer_encoded_args_files(paths: list[Path], to_file: str | None) -> dict[str, str]:
-    buffer = io.BytesIO()
+def package_files(package: Path) -> list[Path]:
+    """
+    The files of a directory package, in a stable order. Like the project files, anything matching the
+    default ignore patterns (version control, caches, build metadata) or the package's own
+    .gitignore/.locustcloudignore is left out.
+    """
+    ignore_rules = IgnoreRules.from_files(package)
+    files = []
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)
+    for root, dir_names, file_names in os.walk(package):
+        root_path = Path(root)
+        relative = root_path.relative_to(package)
+        dir_names[:] = sorted(d for d in dir_names if not ignore_rules.is_ignored(relative / d, is_dir=True))
+        files.extend(root_path / name for name in sorted(file_names) if not ignore_rules.is_ignored(relative / name))
 
-        for src in paths:
-            src_path = Path(src)
-            dest_path = tmp_path / src_path.name
+    return files
 
-            if src_path.is_file():
-                shutil.copy(src_path, dest_path)
-            elif src_path.is_dir():
-                shutil.copytree(src_path, dest_path)
-            else:
-                print(f"Warning: {src} is not a valid file or directory")
 
-        # Create the zip archive
+def flat_transfer_encoded_args_files(paths: list[Path], to_file: str | None) -> dict[str, str]:
+    """
+    Archive the files and directories at the top level of a zip file, reading them straight
+    from where they are. Wheels and sdists are already compressed so they are stored as is,
+    which in turn means the outer gzip layer doesn't need to spend time compressing either.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as buffer:
         with ZipFile(buffer, "w") as zf:
-            for item in tmp_path.iterdir():
-                if item.is_file():
-                    zf.write(item, arcname=item.name)
-                elif item.is_dir():
-                    for root, _, files in os.walk(item):
-                        for file in files:
-                            file_path = Path(root) / file
-                            arcname = file_path.relative_to(tmp_path)
-                            zf.write(file_path, arcname)
+            for src in paths:
+                src_path = Path(src)
 
-    buffer.seek(0)
-    return transfer_encode(f"{to_file}.zip", buffer)
+                if src_path.is_file():
+                    zf.write(src_path, arcname=src_path.name, compress_type=compress_type_for(src_path))
+                elif src_path.is_dir():
+                    for file_path in package_files(src_path):
+                        arcname = file_path.relative_to(src_path.parent)
+                        zf.write(file_path, arcname, compress_type=compress_type_for(file_path))
+                else:
+                    print(f"Warning: {src} is not a valid file or directory")
 
-
-class MergeToTransferEncodedZipFlat(argparse.Action):
-    def __call__(self, parser, namespace, values, option_string=None):
-        paths = cast(list[Path], values)
-        value = flat_transfer_encoded_args_files(paths, option_string.lstrip("-"))
-        setattr(namespace, self.dest, value)
-
-
-class WebLogin(argparse.Action):
-    def __call__(self, parser, namespace, values, option_string=None):
-        web_login()
-        parser.exit()
+        buffer.seek(0)
+        return transfer_encode(f"{to_file}.zip", buffer, compresslevel=0)
 
 
 class WebLogout(argparse.Action):
@@ -166,19 +345,12 @@ class WebLogout(argparse.Action):
         parser.exit()
 
 
-class StackTeardown(argparse.Action):
-    def __call__(self, parser, namespace, values, option_string=None):
-        session = ApiSession(namespace.non_interactive)
-        session.teardown("--delete")
-        parser.exit()
-
-
 cloud_parser = configargparse.ArgumentParser(add_help=False)
 cloud_parser.add_argument(
     "--login",
-    nargs=0,
-    action=WebLogin,
-    help="Launch an interactive session to authenticate your user.\nOnce completed your credentials will be stored and automatically refreshed for quite a long time.\nOnce those expire you will be prompted to perform another login.",
+    action="store_true",
+    default=False,
+    help="Launch an interactive session to authenticate your user (in --region, if given).\nOnce completed your credentials will be stored and automatically refreshed for quite a long time.\nOnce those expire you will be prompted to perform another login.",
 )
 cloud_parser.add_argument(
     "--logout",
@@ -188,15 +360,15 @@ cloud_parser.add_argument(
 )
 cloud_parser.add_argument(
     "--delete",
-    nargs=0,
-    action=StackTeardown,
-    help="Delete a running cluster. Useful if locust-cloud was killed/disconnected or if there was an error.",
+    action="store_true",
+    default=False,
+    help="Delete a running cluster. Useful if locust-cloud was killed/disconnected or if there was an error.\nUses the region you logged in to, unless --region or --regions is given.",
 )
 cloud_parser.add_argument(
     "--requirements",
     metavar="<filename>",
-    type=transfer_encoded_file,
-    help="Optional requirements.txt file that contains your external libraries.",
+    type=valid_requirements_path,
+    help="Optional requirements.txt file that contains your external libraries.\nThe environment built from it (and --extra-packages) is cached, so unchanged dependencies are not reinstalled.",
 )
 cloud_parser.add_argument(
     "--non-interactive",
@@ -212,6 +384,15 @@ cloud_parser.add_argument(
     help="Number of workers to use for the deployment. Defaults to number of users divided by 500, but the default may be customized for your account.",
     default=None,
 )
+cloud_parser.add_argument(
+    "--calibrate",
+    metavar="<seconds>",
+    type=int,
+    nargs="?",
+    const=30,
+    default=None,
+    help="Before deploying, run your locustfile locally against a dummy target and measure how much CPU each user needs over this many seconds (default 30), once all users are running.\nUnless --workers is set, the number of workers is then chosen based on the measurement and --users.",
+)
 cloud_parser.add_argument(
     "--image-tag",
     type=str,
@@ -226,15 +407,92 @@ cloud_parser.add_argument(
     # for internal use. Assumes you've started locust/exporter with something like:
     # LOCUSTCLOUD_SESSION_ID=valid-session-id LOCUST_WEB_LOGIN=1 LOCUST_LOGLEVEL=DEBUG python -m bootstrap
 )
+cloud_parser.add_argument(
+    "--dry-run",
+    action="store_true",
+    default=False,
+    help='Go through the whole packaging, deploy and log streaming process, but against a stand-in deployer that runs the locust master and workers as local processes.\nNothing is sent to locust.cloud and no login is needed. Requirements and extra packages are not installed.\nRequires gevent-websocket (pip install "locust-cloud[dry-run]").',
+)
 cloud_parser.add_argument(
     "--extra-files",
     nargs="*",
     type=valid_project_path,
     help="A list of extra files or directories to upload. Space-separated, e.g. `--extra-files testdata.csv *.py my-directory/`.",
 )
+cloud_parser.add_argument(
+    "--shard-files",
+    nargs="*",
+    type=valid_project_path,
+    help="Data files to split between the workers instead of uploading all of them to every worker, e.g. `--shard-files data/*.csv`.\nEach worker gets a contiguous range of lines (CSV files are split between records and keep their header row). Requires --workers.\nUse locust_cloud.shards.shard_path('data/users.csv') in your locustfile to find the worker's part.",
+)
+cloud_parser.add_argument(
+    "--no-agent",
+    action="store_true",
+    default=False,
+    help="Don't use a running locust-cloud-agent for authentication and packaging, even if there is one.",
+)
+cloud_parser.add_argument(
+    "--log-file",
+    type=valid_log_file,
+    default=None,
+    help="Also write the output of the load generators to this file, compressed according to its suffix (.gz, .bz2, .xz or .zst), e.g. `--log-file run.log.zst`.\nWriting .zst files requires the zstandard package.",
+)
+cloud_parser.add_argument(
+    "--terminal-loglevel",
+    type=str.upper,
+    default=None,
+    choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+    help="Only show log records from the load generators of this level or higher in the terminal. The --log-file gets all of them.",
+)
+cloud_parser.add_argument(
+    "--collapse-logs",
+    type=float,
+    nargs="?",
+    const=1.0,
+    default=None,
+    metavar="SECONDS",
+    help="Print log lines that are repeated within this many seconds (default 1) only once, followed by a summary like '(×250 from 200 workers)'.\nTimestamps and worker names are ignored when comparing lines.",
+)
+cloud_parser.add_argument(
+    "--max-log-rate",
+    type=positive_int,
+    default=None,
+    metavar="LINES",
+    help="Print at most this many log lines per second from the load generators (per stream), and how many were dropped.",
+)
+cloud_parser.add_argument(
+    "--preflight",
+    action=argparse.BooleanOptionalAction,
+    default=True,
+    help="Check that your project compiles while deploying, and stop the deployment right away if it doesn't (default: on).",
+)
+cloud_parser.add_argument(
+    "--preflight-import",
+    action="store_true",
+    default=False,
+    help="Also import your locustfile locally while deploying, and stop the deployment right away if that fails.\nOnly use this if your locustfile can be imported outside of the cloud (modules that aren't installed locally are ignored).",
+)
+cloud_parser.add_argument(
+    "--watch",
+    action="store_true",
+    default=False,
+    help="Keep watching your locustfile, the modules it imports and --extra-files while the test runs.\nWhen they change, only the changed files are uploaded and the test is restarted with them, without redeploying.",
+)
+cloud_parser.add_argument(
+    "--precompile",
+    action="store_true",
+    default=False,
+    help="Upload compiled bytecode along with your Python files, so that workers don't need to compile them when starting.\nOnly takes effect if your local Python version matches the one in the load generator image.",
+)
+cloud_parser.add_argument(
+    "--max-project-size",
+    metavar="<MB>",
+    type=positive_int,
+    default=None,
+    help="Fail before uploading if the project files (locustfiles, imported modules and --extra-files) add up to more than this. Without it, projects larger than 100 MB are only warned about.\nFiles and directories matching .gitignore or .locustcloudignore are not uploaded, unless named explicitly.",
+)
 cloud_parser.add_argument(
     "--extra-packages",
-    action=MergeToTransferEncodedZipFlat,
     nargs="*",
     type=valid_extra_packages_path,
     help="A list of extra packages to upload. Space-separated whl/tar.gz files or directory packages to be installed when running locust.",
@@ -245,6 +503,52 @@ cloud_parser.add_argument(
     default=None,
     help="A list of tags that can be used to filter testruns.",
 )
+cloud_parser.add_argument(
+    "--keep-warm",
+    metavar="<minutes>",
+    type=positive_int,
+    default=None,
+    help="Keep the load generators running for this many minutes after the test finishes normally.\nA later run with the same image, requirements, extra packages and worker count reuses them and only uploads your project files.\nRun locust --delete to tear them down early.",
+)
+cloud_parser.add_argument(
+    "--attach",
+    metavar="<cursor>",
+    nargs="?",
+    type=int,
+    const=0,
+    default=None,
+    help="Reattach to your running test instead of deploying a new one, and follow its output until it finishes. Ctrl-C detaches without stopping the test.\nOptionally pass the id of the last log event you saw to only get output after it (it is logged with --loglevel DEBUG).",
+)
+cloud_parser.add_argument(
+    "--output-dir",
+    metavar="<dir>",
+    type=Path,
+    default=None,
+    help="Download the HTML report and stats files of the test run to this directory when it finishes.",
+)
+cloud_parser.add_argument(
+    "--batch",
+    metavar="<plan.toml>",
+    type=str,
+    default=None,
+    help="Run several scenarios (locustfiles with their own users, workers and args) from a TOML plan, reusing one login and one uploaded project.\nSet parallel = N in the plan to run up to N scenarios at the same time, their output is then prefixed with the scenario name.",
+)
+
+cloud_parser.add_argument(
+    "--region",
+    choices=[*VALID_REGIONS, "auto"],
+    default=None,
+    # LOCUSTCLOUD_REGION already means the region to log in to with --non-interactive
+    env_var="LOCUSTCLOUD_RUN_REGION",
+    help="Region to run the test in, instead of the one you logged in to.\nUse auto to pick the one with the lowest latency from where you are (the result is remembered for a day).",
+)
+cloud_parser.add_argument(
+    "--regions",
+    metavar="<region,...>",
+    type=valid_regions,
+    default=None,
+    help=f"Run the test from several regions at once ({','.join(VALID_REGIONS)}), splitting --users and --workers between them.\nThe output of each region is prefixed with its name, and if the test fails in one region it is stopped in all of them.",
+)
 
 combined_cloud_parser = configargparse.ArgumentParser(
     parents=[cloud_parser],
@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+from locust_cloud.apisession import ApiSession
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+PARALLEL_DOWNLOADS = 4
+MAX_ATTEMPTS = 5
+
+
+@dataclass
+class Artifact:
+    name: str
+    url: str
+    size: int | None = None
+
+
+def list_artifacts(session: ApiSession, session_id: str) -> list[Artifact]:
+    response = session.get(f"/artifacts/{session_id}")
+    response.raise_for_status()
+    return [
+        Artifact(name=artifact["name"], url=artifact["url"], size=artifact.get("size"))
+        for artifact in response.json()["artifacts"]
+    ]
+
+
+def artifact_path(output_dir: Path, name: str) -> Path:
+    path = (output_dir / name).resolve()
+    if not path.is_relative_to(output_dir.resolve()):
+        raise ValueError(f"Refusing to write artifact outside of {output_dir}: {name}")
+    return path
+
+
+def partial_path(path: Path, session_id: str) -> Path:
+    # Named after the test run, so that data left over from another run is never resumed
+    return path.with_name(f".{path.name}.{session_id}.part")
+
+
+def resumes_at(response: requests.Response, offset: int) -> bool:
+    match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range", ""))
+    return bool(match) and int(match[1]) == offset
+
+
+def download_artifact(http: requests.Session, artifact: Artifact, output_dir: Path, session_id: str) -> Path:
+    """
+    Stream an artifact to disk. The data goes to a .part file first, and if the transfer
+    is interrupted the next attempt continues where it left off using a Range request.
+    The ETag of the artifact is kept next to the .part file and sent as If-Range, so the server
+    sends the whole file again if it has changed. Partial data that doesn't add up is thrown away.
+    """
+    path = artifact_path(output_dir, artifact.name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = partial_path(path, session_id)
+    etag_file = partial.with_name(f"{partial.name}.etag")
+
+    def discard() -> None:
+        partial.unlink(missing_ok=True)
+        etag_file.unlink(missing_ok=True)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        offset = partial.stat().st_size if partial.exists() else 0
+        etag = etag_file.read_text() if etag_file.exists() else None
+        if offset and not etag:
+            # Without an ETag there is no telling if the data we have is from the same file
+            discard()
+            offset = 0
+        headers = {"Range": f"bytes={offset}-", "If-Range": etag} if offset and etag else {}
+
+        try:
+            with http.get(artifact.url, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code == 416:
+                    if artifact.size is not None and offset == artifact.size:
+                        break  # We already have everything
+                    logger.debug(f"Restarting the download of {artifact.name}, the partial data doesn't match")
+                    discard()
+                    continue
+                response.raise_for_status()
+
+                if response.status_code == 206:
+                    if not resumes_at(response, offset):
+                        logger.debug(f"Restarting the download of {artifact.name}, got an unexpected range")
+                        discard()
+                        continue
+                    mode = "ab"
+                else:
+                    # A server that ignores the Range header, or has a changed file, sends the whole file again
+                    mode = "wb"
+                    if response.headers.get("ETag"):
+                        etag_file.write_text(response.headers["ETag"])
+                    else:
+                        etag_file.unlink(missing_ok=True)
+
+                with open(partial, mode) as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+            break
+        except requests.exceptions.RequestException as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            logger.debug(f"Download of {artifact.name} interrupted ({e}), resuming (attempt {attempt + 1})")
+    else:
+        raise ValueError(f"Could not download {artifact.name} after {MAX_ATTEMPTS} attempts")
+
+    size = partial.stat().st_size
+    if artifact.size is not None and size != artifact.size:
+        discard()
+        raise ValueError(f"Downloaded {size} bytes of {artifact.name}, expected {artifact.size}")
+
+    os.replace(partial, path)
+    etag_file.unlink(missing_ok=True)
+    return path
+
+
+def download_artifacts(
+    session: ApiSession, session_id: str, output_dir: Path, parallel: int = PARALLEL_DOWNLOADS
+) -> bool:
+    """
+    Download the reports and stats files of a test run to output_dir.
+    The artifact urls are presigned, so they are fetched with a separate connection pool
+    that doesn't send our API credentials. Returns False if anything could not be downloaded.
+    """
+    try:
+        artifacts = list_artifacts(session, session_id)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Could not list the artifacts of the test run: {e}")
+        return False
+
+    if not artifacts:
+        logger.info("The test run produced no artifacts to download")
+        return True
+
+    logger.info(f"Downloading {len(artifacts)} artifacts to {output_dir}...")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with requests.Session() as http:
+        adapter = HTTPAdapter(pool_connections=parallel, pool_maxsize=parallel)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+
+        def download(artifact: Artifact) -> bool:
+            try:
+                path = download_artifact(http, artifact, output_dir, session_id)
+                logger.debug(f"Downloaded {path}")
+                return True
+            except (requests.exceptions.RequestException, ValueError, OSError) as e:
+                logger.error(f"Failed to download {artifact.name}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            return all(list(executor.map(download, artifacts)))
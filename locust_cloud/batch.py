@@ -0,0 +1,122 @@
+import logging
+import sys
+from argparse import ArgumentTypeError
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from locust_cloud.args import valid_project_path
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Scenario:
+    name: str
+    locustfiles: list[Path]
+    users: int | None = None
+    workers: int | None = None
+    args: list[str] = field(default_factory=list)
+    extra_files: list[Path] = field(default_factory=list)
+
+
+@dataclass
+class BatchPlan:
+    scenarios: list[Scenario]
+    parallel: int = 1
+
+
+def load_batch_plan(file_path: str) -> BatchPlan:
+    """
+    Parse a batch plan like:
+
+        parallel = 2
+
+        [[scenarios]]
+        name = "checkout"
+        locustfile = "checkout.py"
+        users = 100
+        args = ["--run-time", "5m", "--headless"]
+    """
+    try:
+        with open(file_path, "rb") as f:
+            plan = tomllib.load(f)
+    except FileNotFoundError:
+        raise ArgumentTypeError(f"File not found: {file_path}")
+    except tomllib.TOMLDecodeError as e:
+        raise ArgumentTypeError(f"Couldn't parse batch plan {file_path}: {e}")
+
+    parallel = plan.get("parallel", 1)
+    if not isinstance(parallel, int) or parallel < 1:
+        raise ArgumentTypeError(f"Invalid batch plan {file_path}: 'parallel' must be a positive integer")
+
+    scenarios: list[Scenario] = []
+
+    for i, entry in enumerate(plan.get("scenarios", []), start=1):
+        name = entry.get("name", f"scenario-{i}")
+
+        if name in [scenario.name for scenario in scenarios]:
+            raise ArgumentTypeError(f"Invalid batch plan {file_path}: duplicate scenario name {name!r}")
+
+        locustfiles = entry.get("locustfile")
+        if not locustfiles:
+            raise ArgumentTypeError(f"Invalid batch plan {file_path}: scenario {name!r} has no locustfile")
+        if isinstance(locustfiles, str):
+            locustfiles = [locustfiles]
+
+        scenarios.append(
+            Scenario(
+                name=name,
+                locustfiles=[valid_project_path(lf) for lf in locustfiles],
+                users=entry.get("users"),
+                workers=entry.get("workers"),
+                args=[str(arg) for arg in entry.get("args", [])],
+                extra_files=[valid_project_path(p) for p in entry.get("extra_files", [])],
+            )
+        )
+
+    if not scenarios:
+        raise ArgumentTypeError(f"Invalid batch plan {file_path}: no scenarios defined")
+
+    return BatchPlan(scenarios=scenarios, parallel=parallel)
+
+
+def run_batch(plan: BatchPlan, run_scenario: Callable[[Scenario], int | None]) -> int | None:
+    """
+    Run every scenario in the plan, at most plan.parallel at a time.
+    Returns 1 if any of the scenarios failed.
+    """
+    failed: list[str] = []
+
+    def _run(scenario: Scenario) -> None:
+        logger.info(f"Starting scenario {scenario.name}")
+        try:
+            exit_code = run_scenario(scenario)
+        except Exception as e:
+            logger.exception(e)
+            exit_code = 1
+
+        if exit_code:
+            logger.error(f"Scenario {scenario.name} failed")
+            failed.append(scenario.name)
+        else:
+            logger.info(f"Scenario {scenario.name} finished")
+
+    if plan.parallel == 1:
+        for scenario in plan.scenarios:
+            _run(scenario)
+    else:
+        with ThreadPoolExecutor(max_workers=plan.parallel) as executor:
+            list(executor.map(_run, plan.scenarios))
+
+    if failed:
+        logger.error(f"{len(failed)} of {len(plan.scenarios)} scenarios failed: {', '.join(failed)}")
+        return 1
+
+    return None
@@ -0,0 +1,190 @@
+import http.server
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+import requests
+
+try:
+    import psutil  # installed along with locust, which calibration runs
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_USERS = 20
+# How much of its CPU core a worker should use, leaving headroom for spikes and reporting
+WORKER_CPU_TARGET = 0.7
+# How long locust may take to start and spawn all the users before the measurement starts
+STARTUP_TIMEOUT = 60
+# How long to wait after all users have been spawned, for their on_start to finish, before the measurement starts
+WARMUP = 2
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class CalibrationResult:
+    users: int
+    duration: float
+    cpu_seconds: float
+    requests: int
+
+    @property
+    def cpu_utilization(self) -> float:
+        return self.cpu_seconds / self.duration
+
+    @property
+    def cpu_per_user(self) -> float:
+        return self.cpu_utilization / self.users
+
+    @property
+    def requests_per_core_second(self) -> float:
+        return self.requests / self.cpu_seconds if self.cpu_seconds else 0.0
+
+
+def recommended_workers(result: CalibrationResult, users: int) -> int:
+    return max(1, math.ceil(users * result.cpu_per_user / WORKER_CPU_TARGET))
+
+
+# Answered by the stand-in target with the number of requests it has received (not counting these)
+REQUEST_COUNT_PATH = "/.locust-cloud/request-count"
+
+
+class StandInTargetHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    request_count = 0
+    lock = threading.Lock()
+
+    def respond(self) -> None:
+        if length := int(self.headers.get("Content-Length", 0)):
+            self.rfile.read(length)
+
+        if self.path == REQUEST_COUNT_PATH:
+            body = str(StandInTargetHandler.request_count).encode()
+        else:
+            with StandInTargetHandler.lock:
+                StandInTargetHandler.request_count += 1
+            body = b"{}"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = respond
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def serve_stand_in_target() -> None:
+    """
+    Answers every request immediately with an empty JSON object,
+    so that the calibration measures the cost of the locustfile and not of the target.
+    It also counts them, since locust only writes its stats to disk every few seconds.
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInTargetHandler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+def request_count(port: int) -> int:
+    return int(requests.get(f"http://127.0.0.1:{port}{REQUEST_COUNT_PATH}", timeout=5).text)
+
+
+def wait_for_line(log_file: IO[str], text: str, process: subprocess.Popen, timeout: float) -> bool:
+    """
+    Wait until the process has logged a line containing text. Returns False if it exits or the timeout passes first.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        log_file.seek(0)
+        if text in log_file.read():
+            return True
+        time.sleep(POLL_INTERVAL)
+
+    return False
+
+
+def calibrate(locustfiles: list[Path], seconds: int, users: int = CALIBRATION_USERS) -> CalibrationResult | None:
+    """
+    Run the locustfile locally against a stand-in target and measure how much CPU it uses per user.
+    Only a steady window, starting a little while after all users have been spawned, is measured,
+    so that neither starting locust nor spawning the users (and running their on_start) is counted.
+    """
+    if not psutil:
+        logger.warning("Calibration requires locust to be installed locally")
+        return None
+
+    target = subprocess.Popen(
+        [sys.executable, "-c", "from locust_cloud.calibrate import serve_stand_in_target; serve_stand_in_target()"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    locust = None
+
+    try:
+        assert target.stdout  # typing...
+        port = int(target.stdout.readline())
+
+        with tempfile.TemporaryDirectory() as tmpdir, open(Path(tmpdir) / "locust.log", "w+") as log_file:
+            logger.info(f"Calibrating: running {users} users locally for {seconds}s...")
+            locust = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "locust",
+                    "-f",
+                    ",".join(str(lf) for lf in locustfiles),
+                    "--headless",
+                    "--users",
+                    str(users),
+                    "--spawn-rate",
+                    str(users),
+                    "--host",
+                    f"http://127.0.0.1:{port}",
+                    "--only-summary",
+                ],
+                # Make sure a config file with cloud = true doesn't make this launch a cloud run
+                env={**os.environ, "LOCUST_CLOUD": "false"},
+                stdout=subprocess.DEVNULL,
+                stderr=log_file,
+            )
+
+            if not wait_for_line(log_file, "All users spawned", locust, STARTUP_TIMEOUT):
+                log_file.seek(0)
+                logger.error(f"Calibration run failed to start:\n{log_file.read()}")
+                return None
+            time.sleep(WARMUP)
+
+            # Only this specific child is measured, not the stand-in target
+            process = psutil.Process(locust.pid)
+            start_time, start_cpu, start_requests = time.monotonic(), process.cpu_times(), request_count(port)
+            time.sleep(seconds)
+            end_time, end_cpu, end_requests = time.monotonic(), process.cpu_times(), request_count(port)
+
+            if locust.poll() is not None:
+                log_file.seek(0)
+                logger.error(f"Calibration run failed:\n{log_file.read()}")
+                return None
+
+            return CalibrationResult(
+                users=users,
+                duration=end_time - start_time,
+                cpu_seconds=(end_cpu.user + end_cpu.system) - (start_cpu.user + start_cpu.system),
+                requests=end_requests - start_requests,
+            )
+    finally:
+        for process in (locust, target):
+            if process and process.poll() is None:
+                process.terminate()
+                process.wait()
@@ -0,0 +1,56 @@
+import logging
+from collections.abc import Callable
+
+from locust_cloud.websocket import Websocket
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeControls:
+    """
+    Keyboard shortcuts for controlling a running test from the terminal.
+    Each command is sent as a "control" event to the locust master over the log websocket,
+    and any output it produces comes back on the regular log stream.
+    Add to (or replace entries in) bindings to customize the keys.
+    """
+
+    def __init__(self, websocket: Websocket, users_step: int = 10) -> None:
+        self.websocket = websocket
+        self.users_step = users_step
+        self.bindings: dict[str, Callable[[], None]] = {
+            "+": self.add_users,
+            "-": self.remove_users,
+            "r": self.reset_stats,
+            "s": self.print_stats,
+            "q": self.quit,
+        }
+
+    def help(self) -> str:
+        return f"+/- to add/remove {self.users_step} users, r to reset stats, s to print stats, q to stop the test"
+
+    def send(self, command: str, **kwargs) -> None:
+        if not self.websocket.sio.connected:
+            logger.info("Not connected to the locust master yet")
+            return
+
+        logger.debug(f"Sending control command {command} {kwargs}")
+        self.websocket.sio.emit("control", {"command": command, **kwargs})
+
+    def add_users(self) -> None:
+        logger.info(f"Adding {self.users_step} users")
+        self.send("spawn", delta=self.users_step)
+
+    def remove_users(self) -> None:
+        logger.info(f"Removing {self.users_step} users")
+        self.send("spawn", delta=-self.users_step)
+
+    def reset_stats(self) -> None:
+        logger.info("Resetting stats")
+        self.send("reset_stats")
+
+    def print_stats(self) -> None:
+        self.send("print_stats")
+
+    def quit(self) -> None:
+        logger.info("Stopping the test")
+        self.send("quit")
@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+
+import requests
+from locust_cloud.apisession import ApiSession
+from locust_cloud.args import flat_transfer_encoded_args_files, package_files, transfer_encoded_file
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# An include of another requirements or constraints file, after normalization
+INCLUDE = re.compile(r"^(?P<option>-r|--requirement|-c|--constraint)(?:=| )?(?P<path>\S+)$")
+
+
+def normalized_requirements(text: str) -> list[str]:
+    """
+    Strip comments, whitespace and ordering from a requirements file,
+    so that cosmetic changes don't result in a new environment.
+    """
+    lines = set()
+
+    for line in text.splitlines():
+        # pip only treats # as a comment at the start of a line or after whitespace
+        line = line.split(" #", 1)[0].split("\t#", 1)[0].strip()
+        if line and not line.startswith("#"):
+            lines.add(" ".join(line.split()))
+
+    return sorted(lines)
+
+
+def resolved_requirements(path: Path, seen: set[Path] | None = None) -> list[str]:
+    """
+    The normalized requirements of a file, with the requirements (-r) and constraints (-c) files it
+    includes read in place of the include line, so that changing one of those is noticed too.
+    Included paths are relative to the including file, like pip does. Includes that can't be read
+    locally (like URLs) are kept as they are.
+    """
+    if seen is None:
+        seen = set()
+    seen.add(path.resolve())
+    lines = []
+
+    for line in normalized_requirements(path.read_text()):
+        match = INCLUDE.match(line)
+        if not match or not (path.parent / match["path"]).is_file():
+            lines.append(line)
+            continue
+
+        included = path.parent / match["path"]
+        if included.resolve() in seen:
+            continue
+
+        prefix = "-c " if match["option"] in ("-c", "--constraint") else ""
+        lines.extend(prefix + included_line for included_line in resolved_requirements(included, seen))
+
+    return sorted(set(lines))
+
+
+def _hash_file(digest, path: Path) -> None:
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+
+
+def dependencies_hash(requirements: Path | None, extra_packages: list[Path]) -> str:
+    digest = hashlib.sha256()
+
+    if requirements:
+        digest.update(b"requirements\0")
+        digest.update("\n".join(resolved_requirements(requirements)).encode())
+
+    for package in sorted(extra_packages, key=lambda p: p.name):
+        if package.is_dir():
+            # the same files that are uploaded, so that caches and build output don't result in a new environment
+            for file_path in package_files(package):
+                digest.update(f"\0{file_path.relative_to(package.parent).as_posix()}\0".encode())
+                _hash_file(digest, file_path)
+        else:
+            digest.update(f"\0{package.name}\0".encode())
+            _hash_file(digest, package)
+
+    return digest.hexdigest()
+
+
+def resolve_dependencies(session: ApiSession, requirements: Path | None, extra_packages: list[Path]) -> dict:
+    """
+    Returns the part of the deploy payload that describes the Python environment of the load generators.
+    If the deployer already has an environment built for these exact dependencies only its hash is sent,
+    otherwise the requirements and packages are uploaded along with the hash so the deployer can build
+    the environment once and cache it for subsequent runs.
+    """
+    if not requirements and not extra_packages:
+        return {}
+
+    dependencies: dict = {"dependencies_hash": dependencies_hash(requirements, extra_packages)}
+
+    try:
+        response = session.get(f"/dependencies/{dependencies['dependencies_hash']}")
+        if response.status_code == 200 and response.json().get("cached"):
+            logger.debug(f"Using cached environment {dependencies['dependencies_hash']}")
+            return dependencies
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Could not check for a cached environment: {e}")
+
+    if requirements:
+        dependencies["requirements"] = transfer_encoded_file(str(requirements))
+
+    if extra_packages:
+        dependencies["extra_packages"] = flat_transfer_encoded_args_files(extra_packages, "extra-packages")
+
+    return dependencies
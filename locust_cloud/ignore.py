@@ -0,0 +1,127 @@
+import logging
+import re
+from pathlib import Path, PurePosixPath
+
+logger = logging.getLogger(__name__)
+
+IGNORE_FILES = [".gitignore", ".locustcloudignore"]
+
+# Never useful on the load generators, and often huge
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/",
+    ".hg/",
+    ".svn/",
+    ".venv/",
+    "venv/",
+    "node_modules/",
+    "__pycache__/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".tox/",
+    ".nox/",
+    "*.egg-info/",
+]
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a gitignore style glob to a regular expression matching a posix path.
+    """
+    result = ""
+    i = 0
+
+    while i < len(pattern):
+        c = pattern[i]
+
+        if pattern.startswith("**/", i):
+            result += "(?:.*/)?"
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            result += ".*"
+            i += 2
+            continue
+        elif c == "*":
+            result += "[^/]*"
+        elif c == "?":
+            result += "[^/]"
+        elif c == "[" and (end := pattern.find("]", i + 1)) != -1:
+            content = pattern[i + 1 : end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            result += f"[{content}]"
+            i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            result += re.escape(pattern[i])
+        else:
+            result += re.escape(c)
+
+        i += 1
+
+    return result
+
+
+class IgnoreRule:
+    def __init__(self, pattern: str) -> None:
+        self.negated = pattern.startswith("!")
+        if self.negated:
+            pattern = pattern[1:]
+
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+
+        # Like git, patterns with a slash (other than a trailing one) are relative to the root,
+        # the others match a file or directory name at any depth
+        self.anchored = "/" in pattern
+        self.regex = re.compile(glob_to_regex(pattern.lstrip("/")) + "$")
+
+    def matches(self, path: PurePosixPath, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+
+        return bool(self.regex.match(str(path) if self.anchored else path.name))
+
+
+class IgnoreRules:
+    """
+    A subset of .gitignore semantics: comments, negation, directory-only and
+    root-anchored patterns and * ? [] ** globs. Only the ignore files at the root
+    of the project (the current working directory) are read.
+    """
+
+    def __init__(self, patterns: list[str]) -> None:
+        self.rules: list[IgnoreRule] = []
+
+        for line in patterns:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if line.startswith("\\#") or line.startswith("\\!"):
+                line = line[1:]
+            self.rules.append(IgnoreRule(line.strip()))
+
+    @classmethod
+    def from_files(cls, root: Path | None = None) -> "IgnoreRules":
+        root = root or Path.cwd()
+        patterns = list(DEFAULT_IGNORE_PATTERNS)
+
+        for file_name in IGNORE_FILES:
+            ignore_file = root / file_name
+            if ignore_file.is_file():
+                logger.debug(f"Using ignore rules from {ignore_file}")
+                patterns.extend(ignore_file.read_text().splitlines())
+
+        return cls(patterns)
+
+    def is_ignored(self, path: Path, is_dir: bool = False) -> bool:
+        posix_path = PurePosixPath(path.as_posix())
+        ignored = False
+
+        # The last matching rule wins, which is what makes negation work
+        for rule in self.rules:
+            if rule.negated == ignored and rule.matches(posix_path, is_dir):
+                ignored = not rule.negated
+
+        return ignored
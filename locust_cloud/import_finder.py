@@ -8,6 +8,10 @@ logger = logging.getLogger(__name__)
 
 SITE_PACKAGES_PATHS = [Path(p) for p in [site.getusersitepackages(), *site.getsitepackages()]]
 
+# The modules imported by each file along with its modification time and size when it was parsed,
+# so that long running processes (like the agent) only parse changed files again
+parsed_imports: dict[Path, tuple[int, int, list[str]]] = {}
+
 
 def imported_modules(tree):
     for node in ast.walk(tree):
@@ -21,6 +25,17 @@ def imported_modules(tree):
                 yield node.module
 
 
+def file_imports(path: Path) -> list[str]:
+    stat = path.stat()
+    cached = parsed_imports.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    modules = list(imported_modules(ast.parse(path.read_text())))
+    parsed_imports[path] = (stat.st_mtime_ns, stat.st_size, modules)
+    return modules
+
+
 def get_imported_files(file_path: Path) -> set[Path]:
     """
     Get a list of path that are imported from the given python script
@@ -35,8 +50,7 @@ def get_imported_files(file_path: Path) -> set[Path]:
         if current in paths_seen:
             continue
 
-        tree = ast.parse(current.read_text())
-        for mod in imported_modules(tree):
+        for mod in file_imports(current):
             if mod == "locust":
                 continue  # skip locust imports
 
@@ -5,6 +5,8 @@ import collections
 import logging
 import os
 import sys
+import threading
+import time
 from collections.abc import Callable
 
 import gevent
@@ -35,16 +37,35 @@ class UnixKeyPoller:
             self.stdin = sys.stdin.fileno()
             self.tattr = termios.tcgetattr(self.stdin)
             tty.setcbreak(self.stdin, termios.TCSANOW)
+            # Writing to this pipe wakes up a blocking poll, see interrupt()
+            self.wake_r, self.wake_w = os.pipe()
+            self.captured_chars = collections.deque()
         else:
             raise InitError("Terminal was not a tty. Keyboard input disabled")
 
     def cleanup(self):
         termios.tcsetattr(self.stdin, termios.TCSANOW, self.tattr)
+        os.close(self.wake_r)
+        os.close(self.wake_w)
 
-    def poll(_self):
-        dr, dw, de = select.select([sys.stdin], [], [], 0)
-        if not dr == []:
-            return sys.stdin.read(1)
+    def interrupt(self):
+        os.write(self.wake_w, b"\0")
+
+    def poll(self, timeout: float | None = None):
+        if self.captured_chars:
+            return self.captured_chars.popleft()
+
+        dr, dw, de = select.select([self.stdin, self.wake_r], [], [], timeout)
+        if self.wake_r in dr:
+            os.read(self.wake_r, 1)
+            return None
+        if self.stdin in dr:
+            # Read from the fd directly, anything left in the buffer of sys.stdin would not wake up select
+            if not (data := os.read(self.stdin, 1024)):
+                raise EOFError()
+            self.captured_chars.extend(data.decode(errors="ignore"))
+            if self.captured_chars:
+                return self.captured_chars.popleft()
         return None
 
 
@@ -57,6 +78,7 @@ class WindowsKeyPoller:
                 self.cur_event_length = 0
                 self.cur_keys_length = 0
                 self.captured_chars = collections.deque()
+                self.interrupted = False
             except pywintypes.error:  # type: ignore
                 raise InitError("Terminal says its a tty but we couldn't enable line input. Keyboard input disabled.")
         else:
@@ -65,7 +87,25 @@ class WindowsKeyPoller:
     def cleanup(self):
         pass
 
-    def poll(self):
+    def interrupt(self):
+        self.interrupted = True
+
+    def poll(self, timeout: float | None = None):
+        # There is no cheap way to block on console input without consuming it,
+        # so on Windows we still have to check for new key events periodically
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not self.interrupted:
+            if char := self.peek():
+                return char
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            gevent.sleep(0.2)
+
+        self.interrupted = False
+        return None
+
+    def peek(self):
         if self.captured_chars:
             return self.captured_chars.popleft()
 
@@ -96,25 +136,43 @@ def get_poller():
         return UnixKeyPoller()
 
 
-def input_listener(key_to_func_map: dict[str, Callable]):
-    def input_listener_func():
+class InputListener:
+    """
+    Call functions when keys are pressed. run() blocks (without using any CPU) until a key is pressed
+    or stop() is called, so it is meant to be run in a separate thread/greenlet.
+    """
+
+    def __init__(self, key_to_func_map: dict[str, Callable]):
+        self.key_to_func_map = key_to_func_map
+        self.__stopped = threading.Event()
+        self.__lock = threading.Lock()
+        self.__poller: UnixKeyPoller | WindowsKeyPoller | None = None
+
+    def run(self) -> None:
         try:
             poller = get_poller()
         except InitError:
             # logging.debug(e)
             return
 
+        with self.__lock:
+            self.__poller = poller
+
         try:
-            while True:
-                if input := poller.poll():
-                    for key in key_to_func_map:
-                        if input == key:
-                            key_to_func_map[key]()
-                else:
-                    gevent.sleep(0.2)
+            while not self.__stopped.is_set():
+                if (input := poller.poll()) and input in self.key_to_func_map:
+                    self.key_to_func_map[input]()
+        except EOFError:
+            pass  # stdin was closed, there will be no more input
         except Exception as e:
             logging.warning(f"Exception in keyboard input poller: {e}")
         finally:
-            poller.cleanup()
-
-    return input_listener_func
+            with self.__lock:
+                self.__poller = None
+                poller.cleanup()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        with self.__lock:
+            if self.__poller:
+                self.__poller.interrupt()
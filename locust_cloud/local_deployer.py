@@ -0,0 +1,306 @@
+import atexit
+import base64
+import gzip
+import io
+import itertools
+import json
+import logging
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from zipfile import ZipFile
+
+import gevent.pywsgi
+import socketio
+import socketio.exceptions
+from locust_cloud.apisession import ApiSession
+from locust_cloud.args import CHUNK_SIZE
+from locust_cloud.shards import SHARD_DIR_ENV
+
+try:
+    from geventwebsocket.handler import WebSocketHandler
+except ImportError:
+    WebSocketHandler = None  # only installed with the dry-run extra
+
+MISSING_DEPENDENCY = (
+    'Running with --dry-run requires gevent-websocket, install it with: pip install "locust-cloud[dry-run]"'
+)
+
+logger = logging.getLogger(__name__)
+requests_logger = logging.getLogger(f"{__name__}.requests")
+requests_logger.setLevel(logging.WARNING)
+
+
+def json_response(start_response, status: str, data: dict) -> list[bytes]:
+    body = json.dumps(data).encode()
+    start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+class LocalDeployer:
+    """
+    A stand-in for the locust.cloud deployer that runs a locust master and workers as local processes.
+    It answers /deploy and /teardown like the real thing and serves their output on a Socket.IO
+    log stream, so the CLI can exercise the whole packaging, deploy and streaming path offline.
+    Like the rest of locust, this relies on gevent monkey patching.
+    """
+
+    def __init__(self) -> None:
+        self.session_id: str | None = None
+        self.processes: list[subprocess.Popen] = []
+        self.workdir: tempfile.TemporaryDirectory | None = None
+        self.shard_dir = tempfile.TemporaryDirectory(prefix="locust-cloud-shards-")
+        self.__payload: dict = {}
+        self.__master: subprocess.Popen | None = None
+        self.__event_ids = itertools.count(1)
+        self.__backlog: list[dict] = []
+        self.__subscribers: set[str] = set()
+        self.__lock = threading.Lock()
+
+        self.sio = socketio.Server(async_mode="gevent", always_connect=False, cors_allowed_origins="*")
+        self.sio.on("connect", self.__on_connect)
+        self.sio.on("disconnect", self.__on_disconnect)
+        self.sio.on("subscribe", self.__on_subscribe)
+        self.sio.on("project_update", self.__on_project_update)
+
+        app = socketio.WSGIApp(self.sio, self.__api, socketio_path="socket-logs")
+        self.server = gevent.pywsgi.WSGIServer(("127.0.0.1", 0), app, log=None, error_log=None)
+        if not WebSocketHandler:
+            raise RuntimeError(MISSING_DEPENDENCY)
+        self.server.handler_class = WebSocketHandler
+        # gevent-websocket logs every request on the server's logger, ignoring log=None
+        setattr(self.server, "logger", requests_logger)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> None:
+        self.server.start()
+        atexit.register(self.stop)
+        logger.debug(f"Local deployer listening on {self.url}")
+
+    def stop(self) -> None:
+        self.terminate()
+        self.server.stop()
+        self.shard_dir.cleanup()
+
+    def __api(self, environ, start_response):
+        method = environ["REQUEST_METHOD"]
+        path = environ["PATH_INFO"]
+
+        if method == "POST" and path == "/deploy":
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            return json_response(start_response, "200 OK", self.deploy(json.loads(environ["wsgi.input"].read(length))))
+        elif method == "POST" and path == "/shards":
+            return json_response(start_response, "200 OK", {"shard_id": self.store_shard(environ["wsgi.input"])})
+        elif method == "GET" and path == "/sessions/current":
+            if not any(process.poll() is None for process in self.processes):
+                return json_response(start_response, "404 Not Found", {"Message": "No running test"})
+            return json_response(start_response, "200 OK", self.current_session())
+        elif method == "POST" and path == "/teardown":
+            self.terminate()
+            return json_response(start_response, "200 OK", {"message": "Terminated local processes"})
+        else:
+            return json_response(start_response, "404 Not Found", {"Message": f"Not found: {method} {path}"})
+
+    def deploy(self, payload: dict) -> dict:
+        self.terminate()
+        self.session_id = str(uuid.uuid4())
+        self.__backlog = []
+
+        self.workdir = tempfile.TemporaryDirectory(prefix="locust-cloud-")
+        self.__extract(payload["project_data"], self.workdir.name)
+
+        if "requirements" in payload or "extra_packages" in payload or "dependencies_hash" in payload:
+            logger.warning("Requirements and extra packages are not installed when running locally")
+
+        self.__payload = payload
+        self.__start()
+
+        return self.current_session()
+
+    def store_shard(self, stream) -> str:
+        """
+        Keep an uploaded shard archive until a deployment refers to it.
+        """
+        shard_id = str(uuid.uuid4())
+        with open(os.path.join(self.shard_dir.name, shard_id), "wb") as f:
+            while chunk := stream.read(CHUNK_SIZE):
+                f.write(chunk)
+        return shard_id
+
+    def __extract_shard(self, shard_id: str, path: str) -> dict[str, str]:
+        with ZipFile(os.path.join(self.shard_dir.name, os.path.basename(shard_id))) as zf:
+            zf.extractall(path)
+        return {SHARD_DIR_ENV: path}
+
+    def __extract(self, encoded_zip: dict, path: str) -> None:
+        with ZipFile(io.BytesIO(gzip.decompress(base64.b64decode(encoded_zip["data"])))) as zf:
+            zf.extractall(path)
+
+    def __start(self) -> None:
+        assert self.workdir  # typing...
+        payload = self.__payload
+        env = {**os.environ, "LOCUST_CLOUD": "false"}
+        flags = []
+        for arg in payload["locust_args"]:
+            if arg["name"] == "LOCUST_FLAGS":
+                flags = shlex.split(arg["value"])
+            else:
+                env[arg["name"]] = arg["value"]
+
+        worker_count = payload.get("worker_count", 1)
+        master_port = self.__free_port()
+        locust = [sys.executable, "-m", "locust"]
+
+        master_env = env
+        if payload.get("master_shard"):
+            master_env = {**env, **self.__extract_shard(payload["master_shard"], self.__shard_path("master"))}
+
+        self.__master = self.__spawn(
+            [
+                *locust,
+                *flags,
+                "--master",
+                "--master-bind-port",
+                str(master_port),
+                "--expect-workers",
+                str(worker_count),
+            ],
+            master_env,
+            is_master=True,
+        )
+        shards = payload.get("shards", [])
+        for i in range(worker_count):
+            worker_env = env
+            if shards:
+                worker_env = {**env, **self.__extract_shard(shards[i], self.__shard_path(str(i)))}
+            self.__spawn([*locust, "--worker", "--master-port", str(master_port)], worker_env)
+
+    def update_project(self, update: dict) -> None:
+        """
+        Apply changed and deleted project files, and restart the test with them.
+        """
+        if not self.workdir:
+            return
+
+        if update.get("project_data"):
+            self.__extract(update["project_data"], self.workdir.name)
+        for path in update.get("deleted", []):
+            target = os.path.realpath(os.path.join(self.workdir.name, path))
+            if target.startswith(os.path.realpath(self.workdir.name) + os.sep) and os.path.isfile(target):
+                os.remove(target)
+
+        self.__send({"type": "stdout", "message": "Project files updated, restarting the test\n"})
+        self.__master = None  # so that the old master exiting isn't reported as a shutdown
+        self.terminate()
+        self.__start()
+
+    def current_session(self) -> dict:
+        return {
+            "log_ws_url": f"{self.url.replace('http', 'ws')}/socket-logs",
+            "session_id": self.session_id,
+            "worker_count": len(self.processes) - 1,
+        }
+
+    def terminate(self) -> None:
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            process.wait()
+        self.processes = []
+
+    def __shard_path(self, name: str) -> str:
+        assert self.workdir  # typing...
+        return os.path.join(self.workdir.name, ".shards", name)
+
+    def __free_port(self) -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    def __spawn(self, command: list[str], env: dict[str, str], is_master: bool = False) -> subprocess.Popen:
+        assert self.workdir  # typing...
+        process = subprocess.Popen(
+            command, cwd=self.workdir.name, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        self.processes.append(process)
+
+        readers = [
+            threading.Thread(target=self.__forward, args=(process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self.__forward, args=(process.stderr, "stderr"), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        if is_master:
+
+            def wait_for_master():
+                process.wait()
+                for reader in readers:
+                    reader.join()
+                if process is not self.__master:
+                    return  # replaced by a restart
+                self.terminate()
+                self.__send({"type": "shutdown", "message": f"Locust master exited with code {process.returncode}"})
+
+            threading.Thread(target=wait_for_master, daemon=True).start()
+
+        return process
+
+    def __forward(self, stream, type: str) -> None:
+        for line in stream:
+            self.__send({"type": type, "message": line})
+
+    def __send(self, event: dict) -> None:
+        data = {"events": [event], "id": next(self.__event_ids)}
+        with self.__lock:
+            self.__backlog.append(data)
+            subscribers = list(self.__subscribers)
+
+        for sid in subscribers:
+            self.sio.emit("events", data, to=sid)
+
+    def __on_connect(self, sid, environ, auth) -> None:  # noqa: ARG002
+        if auth != self.session_id:
+            raise socketio.exceptions.ConnectionRefusedError("Session mismatch")
+
+    def __on_disconnect(self, sid, *args) -> None:  # noqa: ARG002
+        with self.__lock:
+            self.__subscribers.discard(sid)
+
+    def __on_project_update(self, sid, update) -> None:  # noqa: ARG002
+        self.update_project(update)
+
+    def __on_subscribe(self, sid, options=None) -> None:
+        cursor = (options or {}).get("cursor", 0)
+        with self.__lock:
+            backlog = [data for data in self.__backlog if data["id"] > cursor]
+            self.__subscribers.add(sid)
+
+        for data in backlog:
+            self.sio.emit("events", data, to=sid)
+
+
+class LocalApiSession(ApiSession):
+    """
+    An ApiSession talking to a LocalDeployer, which needs no authentication.
+    """
+
+    def __init__(self, deployer: LocalDeployer) -> None:
+        self.__deployer = deployer
+        super().__init__(non_interactive=True)
+
+    def login(self, region: str | None) -> None:  # noqa: ARG002
+        self.region = "local"
+        self.api_url = self.__deployer.url
+
+    def authorization(self) -> tuple[str, int]:
+        return "", sys.maxsize
@@ -0,0 +1,131 @@
+"""
+Writing the output of the load generators to a (compressed) file, for looking at after the test.
+"""
+
+import atexit
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import queue
+import time
+from pathlib import Path
+
+from gevent import monkey
+
+try:
+    import zstandard  # pyright: ignore[reportMissingImports]
+except ImportError:
+    zstandard = None  # .zst log files are not supported
+
+logger = logging.getLogger(__name__)
+
+# How many messages may be waiting to be written before new ones are dropped
+QUEUE_SIZE = 10000
+# How often (in seconds) to flush what has been written, so the file is useful while the test is running
+FLUSH_INTERVAL = 1.0
+# How long to wait for what is still queued to be written when closing
+CLOSE_TIMEOUT = 30
+
+
+def open_compressed(path: Path) -> io.BufferedIOBase:
+    """
+    Open a file for writing, compressed according to its suffix (.gz, .bz2, .xz or .zst).
+    """
+    if path.suffix == ".gz":
+        return gzip.open(path, "wb")
+    elif path.suffix == ".bz2":
+        return bz2.open(path, "wb")
+    elif path.suffix == ".xz":
+        return lzma.open(path, "wb")
+    elif path.suffix == ".zst":
+        if not zstandard:
+            raise RuntimeError("Writing .zst files requires the zstandard package")
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"))  # type: ignore[return-value]
+    else:
+        return open(path, "wb")
+
+
+class LogFile:
+    """
+    Messages are handed to a background thread, which does the compressing and writing.
+    The CLI runs on a single gevent hub, so this has to be a real OS thread with a queue that isn't
+    monkey patched, or compressing and writing would still hold up receiving the log stream.
+    write() never blocks: if the disk can't keep up and the queue is full, messages are dropped and counted instead.
+    """
+
+    def __init__(self, path: Path, queue_size: int = QUEUE_SIZE, flush_interval: float = FLUSH_INTERVAL) -> None:
+        self.path = path
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.error: Exception | None = None
+        self.__queue = monkey.get_original("queue", "SimpleQueue")()
+        self.__done = monkey.get_original("_thread", "allocate_lock")()
+        self.__started = False
+        self.__closed = False
+
+    def start(self) -> "LogFile":
+        self.__done.acquire()
+        monkey.get_original("_thread", "start_new_thread")(self.__run, ())
+        self.__started = True
+        # Make sure everything is written even if the CLI exits without closing the file
+        atexit.register(self.close)
+        return self
+
+    def write(self, message: str) -> None:
+        if self.__closed or self.error:
+            return
+        if self.__queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            return
+
+        self.__queue.put(message)
+
+    def close(self) -> None:
+        if self.__closed:
+            return
+
+        self.__closed = True
+        if self.__started:
+            self.__queue.put(None)
+            if not self.__done.acquire(timeout=CLOSE_TIMEOUT):
+                logger.warning(f"Gave up waiting for the rest of the output to be written to {self.path}")
+
+        # Logged from here, since logging uses (monkey patched) locks that the writer thread shouldn't touch
+        if self.error:
+            logger.error(f"Could not write log file {self.path}: {self.error}")
+        elif self.dropped:
+            logger.warning(f"{self.dropped} messages could not be written to {self.path}, the disk did not keep up")
+
+    def __run(self) -> None:
+        try:
+            with open_compressed(self.path) as f:
+                last_flush = time.monotonic()
+                while True:
+                    try:
+                        message = self.__queue.get(timeout=self.flush_interval)
+                    except queue.Empty:
+                        message = ""
+
+                    # Write everything that is already waiting in one go
+                    messages = [message]
+                    while message is not None and not self.__queue.empty():
+                        message = self.__queue.get()
+                        messages.append(message)
+
+                    data = "".join(m for m in messages if m).encode()
+                    if data:
+                        f.write(data)
+
+                    if message is None:
+                        return
+
+                    if time.monotonic() - last_flush >= self.flush_interval:
+                        f.flush()
+                        last_flush = time.monotonic()
+        except (OSError, RuntimeError) as e:
+            self.error = e
+        finally:
+            self.__done.release()
@@ -0,0 +1,173 @@
+"""
+Collapsing repeated log lines from the load generators, so that an error logged by every worker
+(which with hundreds of workers can mean thousands of lines per second) doesn't flood the terminal.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# "[2025-01-01 00:00:00,000] worker-hostname/INFO/locust.runners: message"
+LOG_LINE = re.compile(r"^\[(?P<time>[^\]]+)\] (?P<source>[^/\s]+)/(?P<rest>(?P<level>[A-Z]+)/.*)$")
+
+# How many different lines to keep track of at once, any others are passed through as they are
+MAX_TRACKED_LINES = 10000
+
+
+@dataclass
+class Repeated:
+    type: str
+    line: str
+    started: float
+    sources: set[str]
+    count: int = 1
+
+
+class LogReducer:
+    """
+    Prints the first occurrence of a log record right away, and then counts identical ones
+    (ignoring their timestamp and which worker they came from) until the window has passed,
+    after which a single summary line like "... (×250 from 200 workers)" is printed.
+    If max_rate is set, at most that many lines per second are printed for stdout and stderr each,
+    counting the summaries and the "... lines dropped" notices too.
+    The number of received, collapsed and dropped lines are always counted exactly.
+    """
+
+    def __init__(self, window: float = 0, max_rate: int | None = None, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.max_rate = max_rate
+        self.received: Counter[str] = Counter()
+        self.collapsed: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
+        self.__clock = clock
+        self.__repeated: dict[str, Repeated] = {}
+        self.__rate_second: dict[str, int] = {}
+        self.__rate_count: Counter[str] = Counter()
+        self.__rate_dropped: Counter[str] = Counter()
+        self.__lock = threading.Lock()
+
+    @property
+    def pending(self) -> bool:
+        """
+        True if there are collapsed or dropped lines that haven't been summarized yet.
+        """
+        return any(repeated.count > 1 for repeated in self.__repeated.values()) or any(self.__rate_dropped.values())
+
+    def feed(self, type: str, message: str) -> list[tuple[str, str]]:
+        """
+        Returns the (type, line) pairs that should be written now.
+        """
+        output: list[tuple[str, str]] = []
+        with self.__lock:
+            now = self.__clock()
+            self.__expire(now, now, output)
+
+            for line in message.splitlines(keepends=True):
+                self.received[type] += 1
+                if self.window and not self.__collapse(type, line, now):
+                    continue
+                if self.max_rate and not self.__within_rate(type, now):
+                    continue
+                output.append((type, line))
+
+        return output
+
+    def flush(self, force: bool = False) -> list[tuple[str, str]]:
+        """
+        Returns the summaries of windows that have passed, or of all of them if force is set.
+        """
+        output: list[tuple[str, str]] = []
+        with self.__lock:
+            now = self.__clock()
+            self.__expire(float("inf") if force else now, now, output)
+        return output
+
+    def __collapse(self, type: str, line: str, now: float) -> bool:
+        """
+        Returns True if the line should be written, False if it was counted as a repeat.
+        """
+        match = LOG_LINE.match(line)
+        if not match:
+            # Only log records are collapsed, other output (like the stats tables) repeats lines on purpose
+            return True
+
+        key = f"{type}:{match['rest']}"
+        repeated = self.__repeated.get(key)
+        if repeated is None:
+            if len(self.__repeated) < MAX_TRACKED_LINES:
+                self.__repeated[key] = Repeated(type, line, now, sources={match["source"]})
+            return True
+
+        repeated.count += 1
+        repeated.line = line
+        repeated.sources.add(match["source"])
+        self.collapsed[type] += 1
+        return False
+
+    def __take_rate(self, type: str, now: float) -> bool:
+        """
+        Use up one of this second's lines, returning False if there are none left.
+        """
+        second = int(now)
+        if self.__rate_second.get(type) != second:
+            self.__rate_second[type] = second
+            self.__rate_count[type] = 0
+
+        if self.__rate_count[type] >= (self.max_rate or 0):
+            return False
+
+        self.__rate_count[type] += 1
+        return True
+
+    def __within_rate(self, type: str, now: float) -> bool:
+        if self.__take_rate(type, now):
+            return True
+
+        self.__rate_dropped[type] += 1
+        self.dropped[type] += 1
+        return False
+
+    def __expire(self, until: float, now: float, output: list[tuple[str, str]]) -> None:
+        """
+        Summarize the windows that started more than window seconds before until,
+        and the lines dropped in seconds before it.
+        """
+        # Windows are kept in the order they started, so the expired ones are all at the front
+        while self.__repeated:
+            key, repeated = next(iter(self.__repeated.items()))
+            if repeated.started + self.window > until:
+                break
+
+            del self.__repeated[key]
+            if repeated.count > 1 and (not self.max_rate or self.__within_rate(repeated.type, now)):
+                output.append((repeated.type, summary(repeated)))
+
+        for type, second in list(self.__rate_second.items()):
+            if not self.__rate_dropped[type] or second + 1 > until:
+                continue
+            # The last notice is always written, otherwise it waits until there is room for it
+            if until != float("inf") and not self.__take_rate(type, now):
+                continue
+
+            output.append((type, f"{self.__rate_dropped[type]} {type} lines dropped (over {self.max_rate} lines/s)\n"))
+            self.__rate_dropped[type] = 0
+
+
+def record_level(line: str) -> int | None:
+    """
+    The level of a log record from the load generators, or None if the line isn't one.
+    """
+    match = LOG_LINE.match(line)
+    level = logging.getLevelName(match["level"]) if match else None
+    return level if isinstance(level, int) else None
+
+
+def summary(repeated: Repeated) -> str:
+    line = repeated.line.rstrip("\n")
+    if len(repeated.sources) > 1:
+        return f"{line} (×{repeated.count} from {len(repeated.sources)} workers)\n"
+    return f"{line} (×{repeated.count})\n"
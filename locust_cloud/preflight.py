@@ -0,0 +1,132 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_TIMEOUT = 60
+# How much of the output of a failed import check to show
+OUTPUT_LINES = 20
+# What python -m locust_cloud.preflight exits with when a file doesn't compile (as opposed to crashing)
+COMPILE_ERRORS_EXIT_CODE = 3
+
+
+def compile_errors(files: Iterable[Path]) -> list[str]:
+    errors = []
+    for path in files:
+        if path.suffix != ".py":
+            continue
+        try:
+            compile(path.read_bytes(), str(path), "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            errors.append(f"{path}: {e}")
+
+    return errors
+
+
+def compile_error(files: Iterable[Path], timeout: float) -> str | None:
+    """
+    Compile the files in a separate process. The CLI runs on a single gevent hub,
+    so compiling in this process would hold up the deploy instead of running next to it.
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "locust_cloud.preflight"],
+            input="\n".join(str(path) for path in files if path.suffix == ".py"),
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        logger.debug(f"Skipping the compile check, it took more than {timeout}s")
+        return None
+
+    if result.returncode == COMPILE_ERRORS_EXIT_CODE:
+        return result.stdout.strip()
+    if result.returncode != 0:
+        logger.debug(f"Compile check could not run: {result.stderr.strip()}")
+
+    return None
+
+
+def import_error(locustfiles: list[Path], timeout: float) -> str | None:
+    """
+    Import the locustfiles in a separate locust process, the same way the master will.
+    Modules that aren't installed locally are ignored, since they may be in the requirements for the cloud.
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "locust", "-f", ",".join(str(lf) for lf in locustfiles), "--list"],
+            # Make sure a config file with cloud = true doesn't make this launch a cloud run
+            env={**os.environ, "LOCUST_CLOUD": "false"},
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return f"Importing the locustfile took more than {timeout}s"
+
+    if result.returncode == 0:
+        return None
+
+    # Leave out any noise from the interpreter shutting down after the error
+    output = (result.stderr or result.stdout).split("\nException ignored in")[0].strip()
+    if "ModuleNotFoundError" in output:
+        logger.debug(f"Skipping the import check, a module is not installed locally:\n{output}")
+        return None
+
+    return "\n".join(output.splitlines()[-OUTPUT_LINES:])
+
+
+class Preflight:
+    """
+    Checks that the project compiles (and optionally that the locustfiles can be imported),
+    in the background while the load generators are being deployed.
+    The import check is opt-in, because a locustfile may well depend on things that only exist in the cloud,
+    like environment variables or files on the workers.
+    """
+
+    def __init__(
+        self,
+        locustfiles: list[Path],
+        files: Iterable[Path],
+        import_check: bool = False,
+        timeout: float = PREFLIGHT_TIMEOUT,
+    ) -> None:
+        self.locustfiles = locustfiles
+        self.files = list(files)
+        self.import_check = import_check
+        self.timeout = timeout
+        self.error: str | None = None
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self) -> "Preflight":
+        self.__thread.start()
+        return self
+
+    def wait(self) -> str | None:
+        """
+        Wait for the checks to finish. Returns what went wrong, or None if everything looks fine.
+        """
+        self.__thread.join()
+        return self.error
+
+    def __run(self) -> None:
+        try:
+            self.error = compile_error(self.files, self.timeout)
+            if not self.error and self.import_check:
+                self.error = import_error(self.locustfiles, self.timeout)
+        except Exception as e:
+            logger.debug(f"Preflight check could not run: {e}")
+
+
+if __name__ == "__main__":
+    # Used by compile_error, reads the paths to compile from stdin
+    if errors := compile_errors(Path(line) for line in sys.stdin.read().splitlines()):
+        print("\n".join(errors))
+        sys.exit(COMPILE_ERRORS_EXIT_CODE)
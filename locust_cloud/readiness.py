@@ -0,0 +1,68 @@
+import logging
+import time
+
+import requests
+from locust_cloud.apisession import ApiSession
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1
+
+# Stages reported by the deployer, with how long each one is allowed to take (in seconds)
+STAGES = {
+    "queued": ("Waiting for capacity", 120),
+    "pulling_image": ("Pulling image", 180),
+    "installing_dependencies": ("Installing dependencies", 600),
+    "starting_workers": ("Starting workers", 120),
+}
+
+
+class ReadinessError(Exception):
+    pass
+
+
+def wait_until_ready(session: ApiSession, session_id: str, poll_interval: float = POLL_INTERVAL) -> bool:
+    """
+    Poll the deployer for the progress of the load generators, logging each stage as it is reached,
+    until the locust master is ready to accept connections. Each stage has its own timeout.
+    Returns False if the deployer doesn't report readiness (or the status can't be fetched before
+    any stage has been reported), in which case the caller should fall back to retrying the connection
+    until it succeeds. Only a failed stage, or a stage that takes too long, raises a ReadinessError.
+    """
+    stage = ""
+    stage_started = time.monotonic()
+    workers_connected = None
+
+    while True:
+        try:
+            response = session.get(f"/sessions/{session_id}/status", timeout=10)
+            response.raise_for_status()
+            status = response.json()
+        except requests.exceptions.RequestException as e:
+            if not stage:
+                # Either the deployer doesn't report readiness, or it is not available yet.
+                # Don't risk failing a test that would have started fine.
+                logger.debug(f"Not waiting for the load generators to report readiness: {e}")
+                return False
+            logger.debug(f"Could not get the status of the load generators: {e}")
+            status = {"stage": stage}
+
+        if status["stage"] == "ready":
+            return True
+        if status["stage"] == "failed":
+            raise ReadinessError(f"The load generators failed to start: {status.get('message', 'unknown error')}")
+
+        if status["stage"] != stage:
+            stage = status["stage"]
+            stage_started = time.monotonic()
+            logger.info(f"{STAGES.get(stage, (stage,))[0]}...")
+
+        if "workers_connected" in status and status["workers_connected"] != workers_connected:
+            workers_connected = status["workers_connected"]
+            logger.info(f"{workers_connected}/{status['worker_count']} workers connected")
+
+        label, timeout = STAGES.get(stage, (stage or "Waiting for the deployer", 120))
+        if time.monotonic() - stage_started > timeout:
+            raise ReadinessError(f"Timed out after {timeout}s: {label}")
+
+        time.sleep(poll_interval)
@@ -0,0 +1,122 @@
+import json
+import logging
+import pathlib
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import platformdirs
+import requests
+from locust_cloud.common import VALID_REGIONS, get_api_url
+
+logger = logging.getLogger(__name__)
+
+REGION_CACHE_FILE = pathlib.Path(platformdirs.user_cache_dir(appname="locust-cloud")) / "nearest-region.json"
+REGION_CACHE_TTL = 24 * 60 * 60
+PROBE_ATTEMPTS = 3
+PROBE_TIMEOUT = 3
+
+
+def probe_latency(region: str, attempts: int = PROBE_ATTEMPTS) -> float | None:
+    """
+    Returns the fastest round trip to the region's API (over a reused connection,
+    so that it doesn't measure the TLS handshake), or None if it could not be reached.
+    """
+    latencies = []
+    with requests.Session() as session:
+        for _ in range(attempts):
+            start = time.perf_counter()
+            try:
+                session.get(get_api_url(region), timeout=PROBE_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"Could not reach {region}: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    return min(latencies) if latencies else None
+
+
+def nearest_region(cache_file: pathlib.Path = REGION_CACHE_FILE, ttl: int = REGION_CACHE_TTL) -> str | None:
+    """
+    Find the region with the lowest latency, probing all of them at the same time.
+    The result is cached for a day, since it doesn't change unless you move.
+    """
+    try:
+        cached = json.loads(cache_file.read_text())
+        if cached["region"] in VALID_REGIONS and cached["expires"] > time.time():
+            logger.debug(f"Using cached nearest region {cached['region']}")
+            return cached["region"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with ThreadPoolExecutor(max_workers=len(VALID_REGIONS)) as executor:
+        latencies = dict(zip(VALID_REGIONS, executor.map(probe_latency, VALID_REGIONS)))
+
+    reachable = {region: latency for region, latency in latencies.items() if latency is not None}
+    if not reachable:
+        logger.warning("Could not reach any region to find the nearest one")
+        return None
+
+    region = min(reachable, key=lambda region: reachable[region])
+    logger.info(
+        f"Using the nearest region {region} ("
+        + ", ".join(f"{r}: {latency * 1000:.0f} ms" for r, latency in reachable.items())
+        + ")"
+    )
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps({"region": region, "expires": time.time() + ttl}))
+    except OSError as e:
+        logger.debug(f"Could not cache the nearest region: {e}")
+
+    return region
+
+
+def split_evenly(total: int, parts: int) -> list[int]:
+    """
+    Split total into parts that differ by at most one, with the larger ones first.
+    """
+    share, remainder = divmod(total, parts)
+    return [share + 1 if i < remainder else share for i in range(parts)]
+
+
+def run_regions(
+    regions: list[str],
+    run_region: Callable[[str], int | None],
+    stop_region: Callable[[str], None],
+) -> int | None:
+    """
+    Run the test in all regions at the same time. If it fails in one region,
+    it is stopped in all the others too. Returns 1 if any of the regions failed.
+    """
+    failed: list[str] = []
+    stopping = threading.Event()
+
+    def _run(region: str) -> None:
+        try:
+            exit_code = run_region(region)
+        except Exception as e:
+            logger.exception(e)
+            exit_code = 1
+
+        if not exit_code:
+            return
+
+        failed.append(region)
+        if not stopping.is_set():
+            stopping.set()
+            for other in regions:
+                if other != region:
+                    logger.error(f"Test failed in {region}, stopping it in {other}")
+                    stop_region(other)
+
+    with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+        list(executor.map(_run, regions))
+
+    if failed:
+        logger.error(f"The test failed in {', '.join(failed)}")
+        return 1
+
+    return None
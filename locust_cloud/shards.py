@@ -0,0 +1,164 @@
+"""
+Splitting data files between workers, so that each worker only receives its own part.
+
+In a locustfile, use shard_path to find the part of a file that belongs to the current worker:
+
+    from locust_cloud.shards import shard_path
+
+    with open(shard_path("data/users.csv")) as f:
+        ...
+
+CSV files are split between records (so quoted fields may contain line breaks) and keep their header row
+in every part. Any other file is split between physical lines, so it must not have records spanning lines.
+"""
+
+import csv
+import io
+import logging
+import os
+import tempfile
+from collections.abc import Generator, Iterable, Sequence
+from pathlib import Path
+from typing import IO
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import requests
+from locust_cloud.args import CHUNK_SIZE, SPOOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Set by the deployer on the master and each worker, pointing at where their shards were extracted
+SHARD_DIR_ENV = "LOCUSTCLOUD_SHARD_DIR"
+
+
+def shard_path(path: str | os.PathLike) -> Path:
+    """
+    Returns the location of the current worker's part of a file passed with --shard-files.
+    The master gets an empty part (only the header row for CSV files), since it doesn't run any users.
+    When not running sharded (like when running locally) this is just the path of the whole file.
+    """
+    shard_dir = os.environ.get(SHARD_DIR_ENV)
+    return Path(shard_dir) / path if shard_dir else Path(path)
+
+
+def split_lines(stream: IO[bytes], size: int, outputs: Sequence[IO[bytes]], header: bool = False) -> bytes:
+    """
+    Split the stream into one contiguous range of whole lines per output, of about the same size.
+    If header is set, the first line is written to every output. Returns the header line (if any).
+    """
+    header_line = stream.readline() if header else b""
+    start = stream.tell()
+
+    for i, output in enumerate(outputs):
+        output.write(header_line)
+        end = start + (size - start) * (i + 1) // len(outputs)
+
+        while (remaining := end - stream.tell()) > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            output.write(chunk)
+
+        # finish the line we stopped in the middle of, unless we ended exactly on a line break
+        if stream.tell() > start and i < len(outputs) - 1:
+            stream.seek(-1, os.SEEK_CUR)
+            if stream.read(1) != b"\n":
+                output.write(stream.readline())
+
+    return header_line
+
+
+def csv_records(stream: IO[bytes]) -> Generator[bytes, None, None]:
+    """
+    Yield the raw bytes of each CSV record, using the csv module to find where records end,
+    so that a quoted field containing line breaks stays in one piece.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="surrogateescape", newline="")
+    lines: list[str] = []
+
+    def read_lines() -> Iterable[str]:
+        for line in text:
+            lines.append(line)
+            yield line
+
+    try:
+        for _ in csv.reader(read_lines()):
+            yield "".join(lines).encode("utf-8", errors="surrogateescape")
+            lines.clear()
+    finally:
+        text.detach()
+
+
+def split_csv(stream: IO[bytes], size: int, outputs: Sequence[IO[bytes]]) -> bytes:
+    """
+    Split the stream into one contiguous range of whole CSV records per output, of about the same size.
+    The header row is written to every output, and returned.
+    """
+    records = csv_records(stream)
+    header = next(records, b"")
+    for output in outputs:
+        output.write(header)
+
+    position = len(header)
+    i = 0
+    for record in records:
+        output = outputs[i]
+        output.write(record)
+        position += len(record)
+        while i < len(outputs) - 1 and position >= len(header) + (size - len(header)) * (i + 1) // len(outputs):
+            i += 1
+
+    return header
+
+
+def shard_archives(paths: list[Path], parts: int) -> list[IO[bytes]]:
+    """
+    Split every file into parts, and return one zip archive per part, followed by one for the master
+    with empty files (or just the header row, for CSV files). Files keep their relative paths inside the archives.
+    The archives are spooled to disk when large, and it is up to the caller to close them.
+    """
+    buffers = [tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) for _ in range(parts + 1)]
+    try:
+        archives = [ZipFile(buffer, "w", compression=ZIP_DEFLATED) for buffer in buffers]
+        for path in paths:
+            logger.debug(f"Splitting {path} into {parts} shards")
+            outputs = [archive.open(path.as_posix(), "w", force_zip64=True) for archive in archives]
+            try:
+                with open(path, "rb") as f:
+                    size = path.stat().st_size
+                    if path.suffix.lower() == ".csv":
+                        header = split_csv(f, size, outputs[:-1])
+                    else:
+                        header = split_lines(f, size, outputs[:-1])
+                outputs[-1].write(header)
+            finally:
+                for output in outputs:
+                    output.close()
+
+        for archive, buffer in zip(archives, buffers):
+            archive.close()
+            buffer.seek(0)
+        return list(buffers)
+    except BaseException:
+        for buffer in buffers:
+            buffer.close()
+        raise
+
+
+def upload_shards(session: requests.Session, paths: list[Path], parts: int) -> dict:
+    """
+    Upload the shards one by one, streamed as they are instead of being encoded into the deploy payload,
+    and return the payload fields referring to them.
+    """
+    archives = shard_archives(paths, parts)
+    try:
+        shard_ids = []
+        for archive in archives:
+            response = session.post("/shards", data=archive, headers={"Content-Type": "application/zip"})
+            response.raise_for_status()
+            shard_ids.append(response.json()["shard_id"])
+    finally:
+        for archive in archives:
+            archive.close()
+
+    return {"shards": shard_ids[:-1], "master_shard": shard_ids[-1]}
@@ -0,0 +1,81 @@
+import logging
+import threading
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+DEBOUNCE = 0.5
+
+Snapshot = dict[Path, tuple[int, int]]
+
+
+def snapshot(paths: Iterable[Path]) -> Snapshot:
+    result = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        result[path] = (stat.st_mtime_ns, stat.st_size)
+    return result
+
+
+class ProjectWatcher:
+    """
+    Polls the project files for changes and reports the changed and deleted files once they stop changing.
+    Only the files already known are checked on each poll. list_files (which may be expensive,
+    like finding imported modules) is called again only after something changed,
+    so new files are picked up once a file that refers to them is saved.
+    """
+
+    def __init__(
+        self,
+        list_files: Callable[[], Iterable[Path]],
+        on_change: Callable[[list[Path], list[Path]], None],
+        interval: float = POLL_INTERVAL,
+        debounce: float = DEBOUNCE,
+    ) -> None:
+        self.list_files = list_files
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.__stopped = threading.Event()
+        self.__snapshot = snapshot(list_files())
+
+    def poll(self) -> bool:
+        """
+        Check for changes once, calling on_change if there were any. Returns whether there were.
+        """
+        if snapshot(self.__snapshot) == self.__snapshot:
+            return False
+
+        # Editors often write files in several steps, and several files may be saved at once
+        current = snapshot(self.list_files())
+        while not self.__stopped.wait(self.debounce):
+            latest = snapshot(self.list_files())
+            if latest == current:
+                break
+            current = latest
+
+        changed = sorted(path for path, stat in current.items() if self.__snapshot.get(path) != stat)
+        # A file that is no longer imported just stops being watched, only one that is gone is deleted remotely
+        deleted = sorted(path for path in self.__snapshot if path not in current and not path.exists())
+        self.__snapshot = current
+
+        if not changed and not deleted:
+            return False
+
+        self.on_change(changed, deleted)
+        return True
+
+    def run(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Failed to update the project files: {e}")
+
+    def stop(self) -> None:
+        self.__stopped.set()
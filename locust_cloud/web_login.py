@@ -1,38 +1,35 @@
 import sys
 import time
 import webbrowser
+from collections.abc import Callable
 
 import requests
 from locust_cloud.common import CloudConfig, get_api_url, write_cloud_config
 
 POLLING_FREQUENCY = 1
+# Backing off any further would make the login feel slow once the user has authorized
+MAX_POLLING_INTERVAL = 1
+LONG_POLL_TIMEOUT = 20
 
 
-def web_login() -> None:
-    try:
-        response = requests.post(f"{get_api_url('us-east-1')}/cli-auth")
-        response.raise_for_status()
-        response_data = response.json()
-        authentication_url = response_data["authentication_url"]
-        result_url = response_data["result_url"]
-    except Exception as e:
-        print("Something went wrong trying to authorize the locust-cloud CLI:", str(e))
-        sys.exit(1)
+def wait_for_authorization(result_url: str, sleep: Callable[[float], None] = time.sleep) -> dict:
+    """
+    Ask for the result of the authorization until it's no longer pending, reusing one connection.
+    The server is asked to hold the request until there is a result (for at most LONG_POLL_TIMEOUT seconds),
+    so the login completes as soon as the user has authorized. If the server answers right away
+    anyway we back off, to avoid hammering it when many people are logging in.
+    """
+    start = time.monotonic()
+    interval = POLLING_FREQUENCY
+    waiting_message_shown = False
 
-    message = f"""
-Attempting to automatically open the SSO authorization page in your default browser.
-If the browser does not open or you wish to use a different device to authorize this request, open the following URL:
-
-{authentication_url}
-    """.strip()
-    print(message)
-
-    webbrowser.open_new_tab(authentication_url)
-
-    try:
-        retries = 0
+    with requests.Session() as session:
         while True:
-            response = requests.get(result_url)
+            request_start = time.monotonic()
+            try:
+                response = session.get(result_url, params={"wait": LONG_POLL_TIMEOUT}, timeout=LONG_POLL_TIMEOUT + 10)
+            except requests.exceptions.Timeout:
+                continue
 
             if not response.ok:
                 print(f"Could not login to Locust Cloud: {response.text}")
@@ -41,22 +38,49 @@ If the browser does not open or you wish to use a different device to authorize
             data = response.json()
 
             if data["state"] == "pending":
-                if retries == 10:
+                if not waiting_message_shown and time.monotonic() - start > 10:
                     print("\nWaiting for response from login...")
+                    waiting_message_shown = True
 
-                retries += 1
-                time.sleep(POLLING_FREQUENCY)
+                if time.monotonic() - request_start < LONG_POLL_TIMEOUT / 2:
+                    sleep(interval)
+                    interval = min(interval * 1.5, MAX_POLLING_INTERVAL)
                 continue
             elif data["state"] == "failed":
                 print(f"\nFailed to authorize CLI: {data['reason']}")
                 sys.exit(1)
             elif data["state"] == "authorized":
                 print("\nAuthorization succeded. Now you can start a cloud run using: locust --cloud ...")
-                break
+                return data
             else:
                 print("\nGot unexpected response when authorizing CLI")
                 sys.exit(1)
 
+
+def web_login(region: str = "us-east-1") -> None:
+    try:
+        response = requests.post(f"{get_api_url(region)}/cli-auth")
+        response.raise_for_status()
+        response_data = response.json()
+        authentication_url = response_data["authentication_url"]
+        result_url = response_data["result_url"]
+    except Exception as e:
+        print("Something went wrong trying to authorize the locust-cloud CLI:", str(e))
+        sys.exit(1)
+
+    message = f"""
+Attempting to automatically open the SSO authorization page in your default browser.
+If the browser does not open or you wish to use a different device to authorize this request, open the following URL:
+
+{authentication_url}
+    """.strip()
+    print(message)
+
+    webbrowser.open_new_tab(authentication_url)
+
+    try:
+        data = wait_for_authorization(result_url)
+
         config = CloudConfig(
             id_token=data["id_token"],
             refresh_token=data["refresh_token"],
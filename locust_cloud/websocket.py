@@ -2,9 +2,13 @@ import logging
 import sys
 import threading
 import urllib.parse
+from collections.abc import Callable
 
+import gevent
 import socketio
 import socketio.exceptions
+from locust_cloud.log_file import LogFile
+from locust_cloud.log_reducer import LogReducer, record_level
 
 logger = logging.getLogger(__name__)
 
@@ -36,17 +40,68 @@ class WebsocketTimeout(Exception):
     pass
 
 
+class Deadline:
+    """
+    Calls on_expired if the deadline passes before it is cancelled.
+    Setting a new deadline replaces the pending one. The deadline is a timer on the gevent hub,
+    the same event loop that the (monkey patched) socketio client runs on, so it needs no thread
+    of its own and doesn't wake anything up until it expires.
+    """
+
+    def __init__(self, on_expired: Callable[[], None]) -> None:
+        self.__on_expired = on_expired
+        self.__timer = None
+        self.closed = False
+
+    def set(self, timeout: float) -> None:
+        if self.closed:
+            raise RuntimeError("Can not set a deadline that has been closed")
+
+        self.cancel()
+        self.__timer = gevent.get_hub().loop.timer(timeout)
+        self.__timer.start(self.__expired)
+
+    def cancel(self) -> None:
+        if self.__timer:
+            self.__timer.close()
+            self.__timer = None
+
+    def close(self) -> None:
+        self.cancel()
+        self.closed = True
+
+    def __expired(self) -> None:
+        self.cancel()
+        # This runs in the hub, which must not block, so the callback gets a greenlet of its own
+        gevent.spawn(self.__on_expired)
+
+
 class Websocket:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        prefix: str = "",
+        reducer: LogReducer | None = None,
+        log_file: LogFile | None = None,
+        terminal_level: int = logging.NOTSET,
+    ) -> None:
         """
         This class was created to encapsulate all the logic involved in the websocket implementation.
         The behaviour of the socketio client once a connection has been established
         is to try to reconnect forever if the connection is lost.
         The way this can be canceled is by setting the _reconnect_abort (threading.Event) on the client
         in which case it will simply proceed with shutting down without giving any indication of an error.
-        This class handles timeouts for connection attempts as well as some logic around when the
-        socket can be shut down. See descriptions on the methods for further details.
+        This class handles timeouts for connection attempts (all sharing a single Deadline) as well as
+        some logic around when the socket can be shut down. See descriptions on the methods for further details.
+        If a prefix is given it is prepended to every line written to stdout/stderr,
+        which is used to tell the log streams apart when several tests run at once.
+        If a reducer is given, repeated log lines are collapsed and rate limited by it.
+        If a log_file is given, all output is written to it as well, regardless of terminal_level
+        (which hides log records below that level from the terminal).
         """
+        self.prefix = prefix
+        self.reducer = reducer
+        self.log_file = log_file
+        self.terminal_level = terminal_level
         self.__shutdown_allowed = threading.Event()
         self.__timeout_on_disconnect = True
         self.initial_connect_timeout = 120
@@ -68,34 +123,41 @@ class Websocket:
         self.sio.on("connect_error", self.__on_connect_error)
         self.sio.on("events", self.__on_events)
 
+        self.__connection_deadline = Deadline(self.__on_connection_timeout)
+        # Prints the summaries of collapsed lines when no more log lines arrive
+        self.__summary_deadline = Deadline(self.__flush_summaries)
+        # Taken for all output, which comes from both the socketio client and the summary deadline
+        self.__write_lock = threading.Lock()
         self.__processed_events: set[int] = set()
+        self.__cursor = 0
+        self.last_event_id = 0
 
     def __set_connection_timeout(self, timeout) -> None:
         """
-        Start a threading.Timer that will set the threading.Event on the socketio client
-        that aborts any further attempts to reconnect, sets an exception on the websocket
-        that will be raised from the wait method and the threading.Event __shutdown_allowed
-        on the websocket that tells the wait method that it should stop blocking.
+        (Re)set the connection deadline. If it passes before a connection is established,
+        __on_connection_timeout aborts any further attempts.
         """
+        self.__connection_deadline.set(timeout)
 
-        def _timeout():
-            logger.debug(f"Websocket connection timed out after {timeout} seconds")
-            self.sio._reconnect_abort.set()
-            self.exception = WebsocketTimeout("Timed out connecting to locust master")
-            self.__shutdown_allowed.set()
-
-        self.__connect_timeout_timer = threading.Timer(timeout, _timeout)
-        self.__connect_timeout_timer.daemon = True
-        # logger.debug(f"Setting websocket connection timeout to {timeout} seconds")
-        self.__connect_timeout_timer.start()
+    def __on_connection_timeout(self) -> None:
+        """
+        Set the threading.Event on the socketio client that aborts any further attempts
+        to reconnect, set an exception on the websocket that will be raised from the wait method
+        and set the threading.Event __shutdown_allowed on the websocket that tells the wait method
+        that it should stop blocking.
+        """
+        logger.debug("Websocket connection timed out")
+        self.sio._reconnect_abort.set()
+        self.exception = WebsocketTimeout("Timed out connecting to locust master")
+        self.__shutdown_allowed.set()
 
     def connect(self, url, *, auth) -> None:
         """
         Send along retry=True when initiating the socketio client connection
         to make it use it's builtin logic for retrying failed connections that
         is usually used for reconnections. This will retry forever.
-        When connecting start a timer to trigger disabling the retry logic and
-        raise a WebsocketTimeout exception.
+        When connecting set a deadline that disables the retry logic and
+        raises a WebsocketTimeout exception.
         """
         ws_connection_info = urllib.parse.urlparse(url)
         self.__set_connection_timeout(self.initial_connect_timeout)
@@ -113,23 +175,34 @@ class Websocket:
 
             raise
 
+    def subscribe(self, cursor: int | None = None) -> None:
+        """
+        Ask the server to start sending log events. If a cursor (an event id) is given,
+        only events after it are requested, which is used when reattaching to a running test.
+        Older events are ignored even if the server sends them anyway.
+        """
+        if cursor is None:
+            self.sio.emit("subscribe")
+        else:
+            self.__cursor = cursor
+            self.sio.emit("subscribe", {"cursor": cursor})
+
     def shutdown(self) -> None:
         """
         When shutting down the socketio client a disconnect event will fire.
-        Before doing so disable the behaviour of starting a threading.Timer
-        to handle timeouts on attempts to reconnect since no further such attempts
-        will be made.
-        If such a timer is already running, cancel it since the client is being shutdown.
+        Before doing so disable the behaviour of setting a deadline
+        for attempts to reconnect since no further such attempts will be made,
+        and stop the pending one since the client is being shutdown.
         """
         self.__timeout_on_disconnect = False
-        if hasattr(self, "__connect_timeout_timer"):
-            self.__connect_timeout_timer.cancel()
+        self.__connection_deadline.close()
+        self.__summary_deadline.close()
         self.sio.shutdown()
 
     def wait(self, timeout=False) -> bool:
         """
         Block until the threading.Event __shutdown_allowed is set, with a timeout if indicated.
-        If an exception has been set on the websocket (from a connection timeout timer or the
+        If an exception has been set on the websocket (from a connection deadline or the
         __on_connect_error method), raise it.
         """
         timeout = self.wait_timeout if timeout else None
@@ -143,14 +216,14 @@ class Websocket:
     def __on_connect(self) -> None:
         """
         This gets events whenever a connection is successfully established.
-        When this happens, cancel the running threading.Timer that would
+        When this happens, cancel the deadline that would
         abort reconnect attempts and raise a WebsocketTimeout exception.
         The wait_timeout is originally set to zero when creating the websocket
         but once a connection has been established this is raised to ensure
         that the server is given the chance to send all the logs and an
         official shutdown event.
         """
-        self.__connect_timeout_timer.cancel()
+        self.__connection_deadline.cancel()
         self.wait_timeout = 90
         logger.debug("Websocket connected")
 
@@ -158,8 +231,8 @@ class Websocket:
         """
         This gets events whenever a connection is lost.
         The socketio client will try to reconnect forever so,
-        unless the behaviour has been disabled, a threading.Timer
-        is started that will abort reconnect attempts and raise a
+        unless the behaviour has been disabled, a deadline
+        is set that will abort reconnect attempts and raise a
         WebsocketTimeout exception.
         """
         if self.__timeout_on_disconnect:
@@ -181,7 +254,12 @@ class Websocket:
             logger.debug(f"Got duplicate data on websocket, id {data['id']}")
             return
 
+        if data["id"] <= self.__cursor:
+            logger.debug(f"Skipping data from before the cursor on websocket, id {data['id']}")
+            return
+
         self.__processed_events.add(data["id"])
+        self.last_event_id = max(self.last_event_id, data["id"])
 
         for event in data["events"]:
             type = event["type"]
@@ -189,21 +267,68 @@ class Websocket:
             if type == "shutdown":
                 shutdown = True
                 shutdown_message = event["message"]
-            elif type == "stdout":
-                sys.stdout.write(event["message"])
-            elif type == "stderr":
-                sys.stderr.write(event["message"])
+            elif type in ("stdout", "stderr"):
+                self.__write(type, event["message"])
             else:
                 raise Exception("Unexpected event type")
 
         if shutdown:
             logger.debug("Got shutdown from locust master")
-            self.__connect_timeout_timer.cancel()  # I dont know exactly why/if this is necessary but we had an issue in status-checker once
+            # A reconnect deadline may still be pending if the connection dropped right before the shutdown
+            self.__connection_deadline.cancel()
+            self.__flush_summaries(force=True)
             if shutdown_message:
-                print(shutdown_message)
+                with self.__write_lock:
+                    print(self.__prefixed(shutdown_message))
+                    if self.log_file:
+                        self.log_file.write(self.__prefixed(f"{shutdown_message}\n"))
 
             self.__shutdown_allowed.set()
 
+    def __write(self, type: str, message: str) -> None:
+        with self.__write_lock:
+            if self.log_file:
+                self.log_file.write(self.__prefixed(message))
+
+            if self.terminal_level:
+                message = "".join(
+                    line
+                    for line in message.splitlines(keepends=True)
+                    if (level := record_level(line)) is None or level >= self.terminal_level
+                )
+                if not message:
+                    return
+
+            if not self.reducer:
+                self.__write_lines([(type, message)])
+                return
+
+            self.__write_lines(self.reducer.feed(type, message))
+            if self.reducer.pending and not self.__summary_deadline.closed:
+                self.__summary_deadline.set(max(self.reducer.window, 1))
+
+    def __write_lines(self, lines: list[tuple[str, str]]) -> None:
+        for type, line in lines:
+            (sys.stdout if type == "stdout" else sys.stderr).write(self.__prefixed(line))
+
+    def __flush_summaries(self, force: bool = False) -> None:
+        if not self.reducer:
+            return
+
+        with self.__write_lock:
+            self.__write_lines(self.reducer.flush(force))
+        if force and (self.reducer.collapsed or self.reducer.dropped):
+            logger.debug(
+                f"Received {self.reducer.received.total()} log lines, collapsed {self.reducer.collapsed.total()} "
+                f"repeated lines and dropped {self.reducer.dropped.total()} over the rate limit"
+            )
+
+    def __prefixed(self, message: str) -> str:
+        if not self.prefix:
+            return message
+
+        return "".join(f"[{self.prefix}] {line}" for line in message.splitlines(keepends=True))
+
     def __on_connect_error(self, data) -> None:
         """
         This gets events whenever there's an error during connection attempts.
@@ -213,7 +338,7 @@ class Websocket:
         instance of locust not started by this CLI.
 
         In that case:
-        Cancel the running threading.Timer that would abort reconnect attempts
+        Cancel the deadline that would abort reconnect attempts
         and raise a WebsocketTimeout exception.
         Set an exception on the websocket that will be raised from the wait method.
         Cancel further reconnect attempts.
@@ -224,7 +349,7 @@ class Websocket:
         if not (isinstance(data, dict) and data.get("message") == "Session mismatch"):
             return
 
-        self.__connect_timeout_timer.cancel()
+        self.__connection_deadline.cancel()
         self.exception = SessionMismatchError(
             "The session from this run of locust-cloud did not match the one on the server"
         )
@@ -0,0 +1,111 @@
+import importlib
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import locust_cloud.agent
+import pytest
+from locust_cloud import project_files
+from locust_cloud.agent import Agent, AgentApiSession, AgentClient, AgentError, AgentServer
+from locust_cloud.args import ProjectTooLarge
+
+
+@pytest.fixture
+def agent_client(tmp_path):
+    path = tmp_path / "agent.sock"
+    server = AgentServer(path, Agent(project_files))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield AgentClient(path)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def project(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "locustfile.py").write_text("import helper\n")
+    (project / "helper.py").write_text("VALUE = 1\n")
+    return project
+
+
+def test_agent_ping(agent_client):
+    assert agent_client.call("ping")["version"] == locust_cloud.agent.__version__
+
+    with pytest.raises(AgentError, match="Unknown operation"):
+        agent_client.call("pineapple")
+
+
+def test_agent_package(agent_client, project, monkeypatch):
+    monkeypatch.chdir(project)
+    zip_project_paths = MagicMock(wraps=locust_cloud.agent.zip_project_paths)
+    monkeypatch.setattr(locust_cloud.agent, "zip_project_paths", zip_project_paths)
+
+    first = agent_client.package([Path("locustfile.py")], [], None, False)
+    assert agent_client.package([Path("locustfile.py")], [], None, False) == first
+    assert zip_project_paths.call_count == 1
+    assert set(zip_project_paths.call_args.args[0]) == {Path("locustfile.py"), Path("helper.py")}
+
+    (project / "helper.py").write_text("VALUE = 22\n")
+    assert agent_client.package([Path("locustfile.py")], [], None, False) != first
+    assert zip_project_paths.call_count == 2
+
+    (project / "helper.py").write_bytes(b"x" * 2 * 1024 * 1024)
+    with pytest.raises(ProjectTooLarge):
+        agent_client.package([Path("locustfile.py")], [], 1, False)
+
+
+def test_agent_token(agent_client, monkeypatch):
+    api_session = MagicMock()
+    api_session.return_value.authorization.return_value = ("token", 2**31)
+    api_session.return_value.region = "eu-north-1"
+    api_session.return_value.api_url = "https://api.example.com/1"
+    monkeypatch.setattr(locust_cloud.agent, "ApiSession", api_session)
+
+    session = AgentApiSession(agent_client, non_interactive=False)
+    assert session.region == "eu-north-1"
+    assert session.headers["Authorization"] == "Bearer token"
+    assert session.headers["X-Client-Version"] == locust_cloud.agent.__version__
+    assert session.authorization() == ("token", 2**31)
+
+    AgentApiSession(agent_client, non_interactive=False)
+    api_session.assert_called_once_with(False, region=None)
+
+
+def test_agent_token_credentials(agent_client, monkeypatch):
+    monkeypatch.setattr(locust_cloud.agent, "credentials_fingerprint", lambda: "agent")
+
+    with pytest.raises(AgentError, match="different credentials"):
+        agent_client.call("token", non_interactive=True, region=None, credentials="client")
+
+
+def test_agent_package_forgets_only_project_modules(project, tmp_path, monkeypatch):
+    site = tmp_path / "site"
+    site.mkdir()
+    (site / "installed_package.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(site))
+
+    def project_files(locustfiles, extra_files):  # noqa: ARG001
+        importlib.import_module("helper")
+        importlib.import_module("installed_package")
+        return set(locustfiles)
+
+    try:
+        Agent(project_files).package(
+            {
+                "cwd": str(project),
+                "locustfiles": ["locustfile.py"],
+                "extra_files": [],
+                "max_size_mb": None,
+                "precompile": False,
+            }
+        )
+
+        assert "helper" not in sys.modules
+        assert "installed_package" in sys.modules
+    finally:
+        sys.modules.pop("installed_package", None)
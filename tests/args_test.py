@@ -1,15 +1,20 @@
 import base64
 import gzip
+import importlib.util
 import io
+import sys
 import tempfile
 from argparse import ArgumentTypeError
 from pathlib import Path
-from zipfile import ZipFile
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
 
 import pytest
 from locust_cloud.args import (
+    ProjectTooLarge,
+    check_project_size,
     combined_cloud_parser,
     expanded,
+    flat_transfer_encoded_args_files,
     transfer_encode,
     transfer_encoded_file,
     valid_project_path,
@@ -60,6 +65,72 @@ def test_project_zip():
         assert zf.namelist() == ["testdata/extra-files/extra.txt"]
 
 
+def test_project_zip_precompile():
+    result = zip_project_paths([Path("testdata/autodetected.py"), Path("testdata/extra-files")], precompile=True)
+    buffer = io.BytesIO(gzip.decompress(base64.b64decode(str.encode(result["data"]))))
+    pyc = f"testdata/__pycache__/autodetected.{sys.implementation.cache_tag}.pyc"
+    with ZipFile(buffer) as zf:
+        assert sorted(zf.namelist()) == [pyc, "testdata/autodetected.py", "testdata/extra-files/extra.txt"]
+        header = zf.read(pyc)[:8]
+
+    assert header[:4] == importlib.util.MAGIC_NUMBER
+    # hash based (bit 0) without checking the source (bit 1)
+    assert int.from_bytes(header[4:8], "little") == 0b01
+
+
+def test_check_project_size(tmp_path):
+    small = tmp_path / "small.txt"
+    small.write_bytes(b"x" * 1024)
+    large = tmp_path / "large.bin"
+    large.write_bytes(b"x" * 2 * 1024 * 1024)
+
+    check_project_size([small, large], max_size_mb=3)
+    check_project_size([small, large], max_size_mb=0)
+
+    with pytest.raises(ProjectTooLarge) as exception:
+        check_project_size([small, large], max_size_mb=1)
+
+    assert "Project files are 2.0 MB, which is more than the limit of 1 MB" in str(exception.value)
+    assert f"2.0 MB {large}" in str(exception.value)
+
+
+def test_check_project_size_warns_without_limit(tmp_path, caplog, monkeypatch):
+    large = tmp_path / "large.bin"
+    large.write_bytes(b"x" * 2 * 1024 * 1024)
+    monkeypatch.setattr("locust_cloud.args.PROJECT_SIZE_WARNING_MB", 3)
+
+    check_project_size([large], max_size_mb=None)
+    assert not caplog.records
+
+    monkeypatch.setattr("locust_cloud.args.PROJECT_SIZE_WARNING_MB", 1)
+    check_project_size([large], max_size_mb=None)
+    assert "Project files are 2.0 MB, uploading them may take a while" in caplog.text
+    assert f"2.0 MB {large}" in caplog.text
+
+
+def test_transfer_encode_large_stream():
+    data = bytes(range(256)) * 50_000
+    result = transfer_encode("large.bin", io.BytesIO(data))
+    assert data == gzip.decompress(base64.b64decode(str.encode(result["data"])))
+
+
+def test_flat_transfer_encoded_args_files(tmp_path):
+    wheel = tmp_path / "helper-1.0-py3-none-any.whl"
+    wheel.write_bytes(b"not really a wheel")
+
+    result = flat_transfer_encoded_args_files([wheel, Path("testdata/extra-package")], "extra-packages")
+    assert result["filename"] == "extra-packages.zip"
+    buffer = io.BytesIO(gzip.decompress(base64.b64decode(str.encode(result["data"]))))
+    with ZipFile(buffer) as zf:
+        assert sorted(zf.namelist()) == [
+            "extra-package/example/__init__.py",
+            "extra-package/setup.py",
+            "helper-1.0-py3-none-any.whl",
+        ]
+        assert zf.getinfo("helper-1.0-py3-none-any.whl").compress_type == ZIP_STORED
+        assert zf.getinfo("extra-package/setup.py").compress_type == ZIP_DEFLATED
+
+
 def test_parser_extra_files(capsys):
     with pytest.raises(SystemExit):
         with tempfile.NamedTemporaryFile() as tmp:
@@ -84,3 +155,13 @@ def test_parser_loglevel(capsys):
 
     expected = "error: argument --loglevel/-L: invalid choice: 'PINEAPPLE'"
     assert expected in capsys.readouterr().err
+
+
+def test_parser_max_log_rate(capsys):
+    options, _ = combined_cloud_parser.parse_known_args("locust-cloud --max-log-rate 100")
+    assert options.max_log_rate == 100
+
+    with pytest.raises(SystemExit):
+        combined_cloud_parser.parse_known_args("locust-cloud --max-log-rate 0")
+
+    assert "argument --max-log-rate: must be at least 1, got 0" in capsys.readouterr().err
@@ -0,0 +1,141 @@
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+import requests_mock
+from locust_cloud.artifacts import Artifact, artifact_path, download_artifact, download_artifacts
+
+URL = "https://artifacts.example.com/report.html?signature=abc"
+
+
+def test_download_artifact(tmp_path):
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=b"<html></html>")
+        with requests.Session() as http:
+            path = download_artifact(http, Artifact("report.html", URL), tmp_path, "session-id")
+
+    assert path == tmp_path / "report.html"
+    assert path.read_bytes() == b"<html></html>"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_download_artifact_resumes(tmp_path):
+    (tmp_path / ".stats.csv.session-id.part").write_bytes(b"first half,")
+    (tmp_path / ".stats.csv.session-id.part.etag").write_text('"abc"')
+
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=206, content=b"second half", headers={"Content-Range": "bytes 11-21/22"})
+        with requests.Session() as http:
+            path = download_artifact(http, Artifact("stats.csv", URL, size=22), tmp_path, "session-id")
+
+        assert m.last_request.headers["Range"] == "bytes=11-"
+        assert m.last_request.headers["If-Range"] == '"abc"'
+
+    assert path.read_bytes() == b"first half,second half"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_download_artifact_ignores_other_sessions(tmp_path):
+    (tmp_path / ".stats.csv.other-session.part").write_bytes(b"old data")
+    (tmp_path / ".stats.csv.other-session.part.etag").write_text('"abc"')
+    (tmp_path / "stats.csv.part").write_bytes(b"old data")
+
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=b"data")
+        with requests.Session() as http:
+            path = download_artifact(http, Artifact("stats.csv", URL), tmp_path, "session-id")
+
+        assert "Range" not in m.last_request.headers
+
+    assert path.read_bytes() == b"data"
+
+
+def test_download_artifact_restarts_on_unexpected_range(tmp_path):
+    (tmp_path / ".stats.csv.session-id.part").write_bytes(b"first half,")
+    (tmp_path / ".stats.csv.session-id.part.etag").write_text('"abc"')
+
+    with requests_mock.Mocker() as m:
+        m.get(
+            URL,
+            [
+                {"status_code": 206, "content": b"half", "headers": {"Content-Range": "bytes 18-21/22"}},
+                {"content": b"first half,second half"},
+            ],
+        )
+        with requests.Session() as http:
+            path = download_artifact(http, Artifact("stats.csv", URL, size=22), tmp_path, "session-id")
+
+        assert "Range" not in m.last_request.headers
+
+    assert path.read_bytes() == b"first half,second half"
+
+
+def test_download_artifact_range_not_satisfiable(tmp_path):
+    partial = tmp_path / ".stats.csv.session-id.part"
+    (tmp_path / ".stats.csv.session-id.part.etag").write_text('"abc"')
+
+    with requests_mock.Mocker() as m:
+        m.get(URL, [{"status_code": 416}, {"status_code": 416}, {"content": b"complete"}])
+        with requests.Session() as http:
+            # All of it was downloaded already
+            partial.write_bytes(b"complete")
+            path = download_artifact(http, Artifact("stats.csv", URL, size=8), tmp_path, "session-id")
+            assert m.call_count == 1
+            assert path.read_bytes() == b"complete"
+
+            # The server has less than we do, so what we have is from something else
+            partial.write_bytes(b"something longer")
+            (tmp_path / ".stats.csv.session-id.part.etag").write_text('"abc"')
+            path = download_artifact(http, Artifact("stats.csv", URL, size=8), tmp_path, "session-id")
+            assert m.call_count == 3
+
+    assert path.read_bytes() == b"complete"
+
+
+def test_download_artifact_wrong_size(tmp_path):
+    with requests_mock.Mocker() as m:
+        m.get(URL, content=b"truncated")
+        with requests.Session() as http:
+            with pytest.raises(ValueError):
+                download_artifact(http, Artifact("stats.csv", URL, size=100), tmp_path, "session-id")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_artifact_retries(tmp_path):
+    with requests_mock.Mocker() as m:
+        m.get(URL, [{"exc": requests.exceptions.ConnectionError}, {"content": b"data"}])
+        with requests.Session() as http:
+            path = download_artifact(http, Artifact("stats.csv", URL), tmp_path, "session-id")
+
+    assert path.read_bytes() == b"data"
+
+
+def test_artifact_path(tmp_path):
+    assert artifact_path(tmp_path, "csv/stats.csv") == tmp_path.resolve() / "csv" / "stats.csv"
+
+    with pytest.raises(ValueError):
+        artifact_path(tmp_path, "../outside.csv")
+
+
+def test_download_artifacts(tmp_path):
+    session = MagicMock()
+    session.get.return_value.json.return_value = {
+        "artifacts": [
+            {"name": "report.html", "url": "https://artifacts.example.com/report.html"},
+            {"name": "stats.csv", "url": "https://artifacts.example.com/stats.csv"},
+            {"name": "broken.csv", "url": "https://artifacts.example.com/broken.csv"},
+        ]
+    }
+
+    with requests_mock.Mocker() as m:
+        m.get("https://artifacts.example.com/report.html", content=b"report")
+        m.get("https://artifacts.example.com/stats.csv", content=b"stats")
+        m.get("https://artifacts.example.com/broken.csv", status_code=403)
+
+        assert not download_artifacts(session, "session-id", tmp_path / "out")
+
+    session.get.assert_called_once_with("/artifacts/session-id")
+    assert (tmp_path / "out" / "report.html").read_bytes() == b"report"
+    assert (tmp_path / "out" / "stats.csv").read_bytes() == b"stats"
+    assert not (tmp_path / "out" / "broken.csv").exists()
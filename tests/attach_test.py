@@ -0,0 +1,47 @@
+import logging
+from datetime import datetime
+from unittest import mock
+
+import locust_cloud
+import pytest
+from locust_cloud.args import combined_cloud_parser
+from locust_cloud.websocket import WebsocketTimeout
+
+
+@pytest.fixture
+def session():
+    session = mock.MagicMock(region="eu-north-1")
+    session.running_session.return_value = {"log_ws_url": "ws://example", "session_id": "abc", "worker_count": 1}
+    return session
+
+
+@pytest.fixture
+def websocket(monkeypatch):
+    websocket = mock.MagicMock(last_event_id=42)
+    monkeypatch.setattr(locust_cloud, "Websocket", lambda **kwargs: websocket)
+    monkeypatch.setattr(locust_cloud, "wait_until_ready", lambda session, session_id: True)
+    return websocket
+
+
+@pytest.mark.parametrize("error", [KeyboardInterrupt, WebsocketTimeout("Timed out")])
+def test_attach_detaches_instead_of_tearing_down(session, websocket, error, caplog):
+    caplog.set_level(logging.INFO)
+    websocket.wait.side_effect = error
+    options, _ = combined_cloud_parser.parse_known_args(["--attach", "7"], env_vars={})
+
+    result = locust_cloud.run(session, {}, options, datetime.now(), interactive=False)
+
+    assert result == (0 if error is KeyboardInterrupt else 1)
+    session.teardown.assert_not_called()
+    websocket.shutdown.assert_called_once()
+    assert "locust --attach 42 --region eu-north-1" in caplog.text
+
+
+def test_interrupt_tears_down_own_test(session, websocket, monkeypatch):
+    monkeypatch.setattr(locust_cloud, "deploy", lambda *args: session.running_session())
+    websocket.wait.side_effect = [KeyboardInterrupt, True]
+    options, _ = combined_cloud_parser.parse_known_args([], env_vars={})
+
+    locust_cloud.run(session, {}, options, datetime.now(), interactive=False)
+
+    session.teardown.assert_called_once_with("KeyboardInterrupt", session_id="abc")
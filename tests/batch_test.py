@@ -0,0 +1,84 @@
+import textwrap
+from argparse import ArgumentTypeError
+from pathlib import Path
+
+import pytest
+from locust_cloud.batch import BatchPlan, Scenario, load_batch_plan, run_batch
+
+
+@pytest.fixture
+def write_plan(tmp_path):
+    def _write_plan(content: str) -> str:
+        path = tmp_path / "plan.toml"
+        path.write_text(textwrap.dedent(content))
+        return str(path)
+
+    return _write_plan
+
+
+def test_load_batch_plan(write_plan):
+    plan = load_batch_plan(
+        write_plan(
+            """
+            parallel = 2
+
+            [[scenarios]]
+            name = "first"
+            locustfile = "locustfile.py"
+            users = 10
+            args = ["--run-time", "1m"]
+
+            [[scenarios]]
+            locustfile = ["locustfile.py", "testdata/autodetected.py"]
+            workers = 3
+            """
+        )
+    )
+
+    assert plan.parallel == 2
+    assert plan.scenarios == [
+        Scenario(name="first", locustfiles=[Path("locustfile.py")], users=10, args=["--run-time", "1m"]),
+        Scenario(
+            name="scenario-2",
+            locustfiles=[Path("locustfile.py"), Path("testdata/autodetected.py")],
+            workers=3,
+        ),
+    ]
+
+
+def test_load_batch_plan_errors(write_plan):
+    with pytest.raises(ArgumentTypeError) as exception:
+        load_batch_plan("does-not-exist.toml")
+
+    assert str(exception.value) == "File not found: does-not-exist.toml"
+
+    with pytest.raises(ArgumentTypeError) as exception:
+        load_batch_plan(write_plan("parallel = 1"))
+
+    assert "no scenarios defined" in str(exception.value)
+
+    with pytest.raises(ArgumentTypeError) as exception:
+        load_batch_plan(write_plan("[[scenarios]]\nname = 'nothing'"))
+
+    assert "scenario 'nothing' has no locustfile" in str(exception.value)
+
+    with pytest.raises(ArgumentTypeError) as exception:
+        load_batch_plan(write_plan("[[scenarios]]\nlocustfile = 'does-not-exist.py'"))
+
+    assert str(exception.value) == "'does-not-exist.py' does not exist"
+
+
+def test_run_batch():
+    scenarios = [Scenario(name=name, locustfiles=[Path("locustfile.py")]) for name in ["a", "b", "c"]]
+    ran = []
+
+    def run_scenario(scenario: Scenario) -> int | None:
+        ran.append(scenario.name)
+        return 1 if scenario.name == "b" else None
+
+    assert run_batch(BatchPlan(scenarios=scenarios), run_scenario) == 1
+    assert ran == ["a", "b", "c"]
+
+    ran.clear()
+    assert run_batch(BatchPlan(scenarios=scenarios[::2], parallel=2), run_scenario) is None
+    assert sorted(ran) == ["a", "c"]
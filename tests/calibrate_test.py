@@ -0,0 +1,59 @@
+import importlib.util
+import subprocess
+import textwrap
+from pathlib import Path
+
+import pytest
+from locust_cloud.calibrate import CalibrationResult, calibrate, recommended_workers
+
+
+def test_recommended_workers():
+    # 20 users using 0.4 cores in total => 0.02 cores per user
+    result = CalibrationResult(users=20, duration=10, cpu_seconds=4, requests=5000)
+    assert result.cpu_per_user == 0.02
+    assert result.requests_per_core_second == 1250
+    assert recommended_workers(result, 100) == 3  # 2 cores at 70% utilization
+    assert recommended_workers(result, 1) == 1
+
+
+@pytest.mark.skipif(not importlib.util.find_spec("locust"), reason="Requires locust")
+def test_calibrate(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("locustfile.py").write_text(
+        textwrap.dedent(
+            """
+            import time
+            from locust import HttpUser, constant, task
+
+            class MyUser(HttpUser):
+                wait_time = constant(0.1)
+
+                def on_start(self):
+                    # expensive, but not part of the steady state that is measured
+                    end = time.process_time() + 0.1
+                    while time.process_time() < end:
+                        pass
+
+                @task
+                def t(self):
+                    self.client.get("/")
+            """
+        )
+    )
+    children = []
+    popen = subprocess.Popen
+    monkeypatch.setattr(
+        subprocess, "Popen", lambda *args, **kwargs: children.append(popen(*args, **kwargs)) or children[-1]
+    )
+
+    result = calibrate([Path("locustfile.py")], 2, users=10)
+
+    assert result
+    assert 1.9 < result.duration < 3
+    # 10 users spending 0.1s of CPU each on start would be 1s on its own
+    assert 0 < result.cpu_seconds < 1
+    # about 10 users * 10 requests per second
+    assert 100 <= result.requests <= 250
+    # both the stand-in target and locust have been stopped
+    assert len(children) == 2
+    assert all(child.poll() is not None for child in children)
@@ -0,0 +1,94 @@
+import base64
+import gzip
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from locust_cloud.dependencies import (
+    dependencies_hash,
+    normalized_requirements,
+    resolve_dependencies,
+    resolved_requirements,
+)
+
+
+def test_normalized_requirements():
+    text = """
+        # comment
+        requests==2.32.3  # pinned
+        python-dotenv==1.0.1
+
+        git+https://github.com/example/repo.git#egg=example
+        requests==2.32.3
+    """
+    assert normalized_requirements(text) == [
+        "git+https://github.com/example/repo.git#egg=example",
+        "python-dotenv==1.0.1",
+        "requests==2.32.3",
+    ]
+
+
+def test_dependencies_hash(tmp_path):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("b==1\na==2\n")
+    first = dependencies_hash(requirements, [Path("testdata/extra-package")])
+
+    requirements.write_text("# reordered\na==2\nb==1\n")
+    assert dependencies_hash(requirements, [Path("testdata/extra-package")]) == first
+
+    requirements.write_text("a==2\nb==2\n")
+    assert dependencies_hash(requirements, [Path("testdata/extra-package")]) != first
+    assert dependencies_hash(None, [Path("testdata/extra-package")]) != first
+
+
+def test_resolved_requirements(tmp_path):
+    (tmp_path / "common").mkdir()
+    (tmp_path / "common" / "base.txt").write_text("a==1\n-r ../requirements.txt\n")
+    (tmp_path / "constraints.txt").write_text("c<3\n")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("-r common/base.txt\n--constraint=constraints.txt\n-r https://example.com/r.txt\nb==2\n")
+
+    assert resolved_requirements(requirements) == ["-c c<3", "-r https://example.com/r.txt", "a==1", "b==2"]
+
+    first = dependencies_hash(requirements, [])
+    (tmp_path / "constraints.txt").write_text("c<4\n")
+    assert dependencies_hash(requirements, []) != first
+
+
+def test_dependencies_hash_ignores_build_output(tmp_path):
+    package = tmp_path / "package"
+    (package / "package").mkdir(parents=True)
+    (package / "package" / "__init__.py").write_text("VALUE = 1\n")
+    first = dependencies_hash(None, [package])
+
+    for ignored in ["package/__pycache__/__init__.cpython-311.pyc", "package.egg-info/PKG-INFO", ".git/HEAD"]:
+        (package / ignored).parent.mkdir(parents=True, exist_ok=True)
+        (package / ignored).write_text("changed")
+    assert dependencies_hash(None, [package]) == first
+
+    (package / "package" / "__init__.py").write_text("VALUE = 2\n")
+    assert dependencies_hash(None, [package]) != first
+
+
+def test_resolve_dependencies_cached():
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = {"cached": True}
+
+    result = resolve_dependencies(session, Path("testdata/requirements.txt"), [])
+    assert list(result) == ["dependencies_hash"]
+    session.get.assert_called_once_with(f"/dependencies/{result['dependencies_hash']}")
+
+
+def test_resolve_dependencies_not_cached():
+    session = MagicMock()
+    session.get.return_value.status_code = 404
+
+    result = resolve_dependencies(session, Path("testdata/requirements.txt"), [Path("testdata/extra-package")])
+    assert set(result) == {"dependencies_hash", "requirements", "extra_packages"}
+    assert (
+        gzip.decompress(base64.b64decode(result["requirements"]["data"]))
+        == Path("testdata/requirements.txt").read_bytes()
+    )
+    assert result["extra_packages"]["filename"] == "extra-packages.zip"
+
+    assert resolve_dependencies(session, None, []) == {}
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from locust_cloud.args import expanded
+from locust_cloud.ignore import IgnoreRules
+
+
+def test_ignore_rules():
+    rules = IgnoreRules(
+        [
+            "# comment",
+            "*.log",
+            "!keep.log",
+            "build/",
+            "/data/raw",
+            "docs/**/*.png",
+        ]
+    )
+
+    assert rules.is_ignored(Path("debug.log"))
+    assert rules.is_ignored(Path("a/b/debug.log"))
+    assert not rules.is_ignored(Path("a/keep.log"))
+    assert rules.is_ignored(Path("a/build"), is_dir=True)
+    assert not rules.is_ignored(Path("a/build"), is_dir=False)
+    assert rules.is_ignored(Path("data/raw"), is_dir=True)
+    assert not rules.is_ignored(Path("other/data/raw"), is_dir=True)
+    assert rules.is_ignored(Path("docs/image.png"))
+    assert rules.is_ignored(Path("docs/a/b/image.png"))
+    assert not rules.is_ignored(Path("image.png"))
+
+
+def test_ignore_rules_from_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.csv\n")
+    (tmp_path / ".locustcloudignore").write_text("!users.csv\n")
+    rules = IgnoreRules.from_files(tmp_path)
+
+    assert rules.is_ignored(Path(".venv"), is_dir=True)
+    assert rules.is_ignored(Path("x/__pycache__"), is_dir=True)
+    assert rules.is_ignored(Path("orders.csv"))
+    assert not rules.is_ignored(Path("users.csv"))
+
+
+def test_expanded_prunes_ignored_directories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for path in ["project/a.py", "project/__pycache__/sub/a.pyc", "project/node_modules/x/index.js", "project/x.log"]:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text("")
+
+    walked = []
+    rules = IgnoreRules(["__pycache__/", "node_modules/", "*.log"])
+    original = rules.is_ignored
+
+    def is_ignored(path, is_dir=False):
+        walked.append(path)
+        return original(path, is_dir)
+
+    monkeypatch.setattr(rules, "is_ignored", is_ignored)
+
+    assert list(expanded([Path("project"), Path("project/x.log")], ignore_rules=rules)) == [
+        Path("project/a.py"),
+        Path("project/x.log"),
+    ]
+    assert Path("__pycache__/sub") not in walked
+    assert Path("node_modules/x") not in walked
+
+
+def test_expanded_includes_explicitly_named_directories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for path in ["testdata/users.csv", "testdata/__pycache__/a.pyc", "testdata/debug.log"]:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text("")
+
+    rules = IgnoreRules(["testdata/", "/testdata/*", "__pycache__/", "*.log"])
+    skipped = []
+
+    assert list(expanded([Path("testdata")], ignore_rules=rules, skipped=skipped)) == [Path("testdata/users.csv")]
+    assert sorted(skipped) == [Path("testdata/__pycache__"), Path("testdata/debug.log")]
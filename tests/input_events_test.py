@@ -0,0 +1,38 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from locust_cloud.input_events import InputListener
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="Uses a pseudo terminal")
+
+
+@pytest.fixture
+def pty_stdin(monkeypatch):
+    master, slave = os.openpty()
+    stdin = open(slave, closefd=True)
+    monkeypatch.setattr(sys, "stdin", stdin)
+    try:
+        yield master
+    finally:
+        stdin.close()
+        os.close(master)
+
+
+def test_input_listener(pty_stdin):
+    pressed = threading.Event()
+    listener = InputListener({"x": pressed.set})
+    thread = threading.Thread(target=listener.run, daemon=True)
+    thread.start()
+
+    time.sleep(0.1)
+    os.write(pty_stdin, b"ax")
+    assert pressed.wait(timeout=2)
+
+    start = time.monotonic()
+    listener.stop()
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 0.5
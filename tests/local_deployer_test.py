@@ -0,0 +1,77 @@
+import importlib.util
+import textwrap
+from pathlib import Path
+
+import pytest
+from locust_cloud.args import zip_project_paths
+from locust_cloud.local_deployer import LocalApiSession, LocalDeployer
+from locust_cloud.websocket import Websocket
+
+pytestmark = pytest.mark.skipif(not importlib.util.find_spec("locust"), reason="Requires locust")
+
+
+@pytest.fixture
+def deployer():
+    deployer = LocalDeployer()
+    deployer.start()
+    try:
+        yield deployer
+    finally:
+        deployer.stop()
+
+
+def test_local_deploy_and_stream(deployer, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    Path("locustfile.py").write_text(
+        textwrap.dedent(
+            """
+            from locust import User, constant, task
+
+            print("locustfile imported")
+
+            class MyUser(User):
+                wait_time = constant(1)
+
+                @task
+                def t(self):
+                    pass
+            """
+        )
+    )
+
+    session = LocalApiSession(deployer)
+    response = session.post(
+        "/deploy",
+        json={
+            "locust_args": [
+                {"name": "LOCUST_LOCUSTFILE", "value": "locustfile.py"},
+                {"name": "LOCUST_FLAGS", "value": "--headless --users 2 --run-time 2s"},
+            ],
+            "project_data": zip_project_paths([Path("locustfile.py")]),
+            "worker_count": 2,
+        },
+    )
+    assert response.status_code == 200
+    js = response.json()
+    assert js["worker_count"] == 2
+    assert session.running_session() == js
+
+    ws = Websocket()
+    ws.connect(js["log_ws_url"], auth=js["session_id"])
+    ws.sio.emit("subscribe")
+    ws.wait()
+    ws.shutdown()
+
+    captured = capsys.readouterr()
+    # once from the master and once from each of the workers
+    assert captured.out.count("locustfile imported") == 3
+    assert "Locust master exited with code 0" in captured.out
+
+
+def test_missing_websocket_handler(monkeypatch):
+    monkeypatch.setattr("locust_cloud.local_deployer.WebSocketHandler", None)
+
+    with pytest.raises(RuntimeError) as exception:
+        LocalDeployer()
+
+    assert 'pip install "locust-cloud[dry-run]"' in str(exception.value)
@@ -0,0 +1,79 @@
+import gzip
+import io
+import lzma
+import time
+from argparse import ArgumentTypeError
+
+import gevent
+import locust_cloud.log_file
+import pytest
+from gevent import monkey
+from locust_cloud.args import valid_log_file
+from locust_cloud.log_file import LogFile
+
+
+@pytest.mark.parametrize("name, read", [("run.log", open), ("run.log.gz", gzip.open), ("run.log.xz", lzma.open)])
+def test_log_file(tmp_path, name, read):
+    path = tmp_path / name
+    log_file = LogFile(path, flush_interval=0.01).start()
+
+    for i in range(1000):
+        log_file.write(f"line {i}\n")
+    log_file.close()
+
+    with read(path, "rt") as f:
+        assert f.read() == "".join(f"line {i}\n" for i in range(1000))
+    assert log_file.dropped == 0
+
+
+def test_log_file_zstandard(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "run.log.zst"
+    log_file = LogFile(path).start()
+
+    log_file.write("hello\n")
+    log_file.close()
+
+    with open(path, "rb") as f:
+        assert zstandard.ZstdDecompressor().stream_reader(f).read() == b"hello\n"
+
+
+def test_log_file_full_queue(tmp_path):
+    log_file = LogFile(tmp_path / "run.log", queue_size=2)
+
+    # nothing is consuming the queue until the writer has started
+    for i in range(5):
+        log_file.write(f"line {i}\n")
+    assert log_file.dropped == 3
+
+    log_file.start()
+    log_file.close()
+    assert (tmp_path / "run.log").read_text() == "line 0\nline 1\n"
+
+
+def test_log_file_slow_disk_does_not_block(monkeypatch, tmp_path):
+    class SlowFile(io.BytesIO):
+        def write(self, data):
+            monkey.get_original("time", "sleep")(0.5)  # blocks the thread it runs in
+            return super().write(data)
+
+    monkeypatch.setattr(locust_cloud.log_file, "open_compressed", lambda path: SlowFile())
+    log_file = LogFile(tmp_path / "run.log").start()
+
+    log_file.write("line\n")
+    start = time.monotonic()
+    for _ in range(10):
+        gevent.sleep(0.01)
+    assert time.monotonic() - start < 0.4
+
+    log_file.close()
+
+
+def test_valid_log_file(tmp_path):
+    assert valid_log_file(str(tmp_path / "run.log.gz")) == tmp_path / "run.log.gz"
+
+    with pytest.raises(ArgumentTypeError, match="Directory not found"):
+        valid_log_file(str(tmp_path / "missing" / "run.log"))
+
+    with pytest.raises(ArgumentTypeError, match="is a directory"):
+        valid_log_file(str(tmp_path))
@@ -0,0 +1,98 @@
+import logging
+
+from locust_cloud.log_reducer import LogReducer, record_level
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def error_line(worker: int, second: int = 0) -> str:
+    return f"[2025-01-01 00:00:0{second},000] worker-{worker}/ERROR/locust.user: Connection refused\n"
+
+
+def test_collapse_repeated_lines():
+    clock = Clock()
+    reducer = LogReducer(window=1, clock=clock)
+
+    output = reducer.feed("stderr", error_line(0))
+    assert output == [("stderr", error_line(0))]
+
+    for worker in range(1, 200):
+        assert reducer.feed("stderr", error_line(worker % 50, second=1)) == []
+    assert reducer.feed("stdout", "something else\n") == [("stdout", "something else\n")]
+    assert reducer.pending
+
+    clock.now += 1
+    output = reducer.feed("stderr", error_line(0, second=2))
+    assert output == [
+        ("stderr", f"{error_line(49, second=1).rstrip()} (×200 from 50 workers)\n"),
+        ("stderr", error_line(0, second=2)),
+    ]
+    assert reducer.received["stderr"] == 201
+    assert reducer.collapsed["stderr"] == 199
+
+
+def test_flush():
+    clock = Clock()
+    reducer = LogReducer(window=10, clock=clock)
+
+    assert reducer.feed("stdout", "-----\n\n-----\n\n") == [("stdout", line) for line in ["-----\n", "\n"] * 2]
+    reducer.feed("stderr", error_line(0) * 3)
+
+    assert reducer.flush() == []
+    assert reducer.flush(force=True) == [("stderr", f"{error_line(0).rstrip()} (×3)\n")]
+    assert not reducer.pending
+    assert reducer.flush(force=True) == []
+
+
+def test_max_rate():
+    clock = Clock()
+    reducer = LogReducer(max_rate=2, clock=clock)
+
+    output = reducer.feed("stdout", "".join(f"line {i}\n" for i in range(5)))
+    assert output == [("stdout", "line 0\n"), ("stdout", "line 1\n")]
+    assert reducer.feed("stderr", "other stream\n") == [("stderr", "other stream\n")]
+
+    clock.now += 1
+    assert reducer.feed("stdout", "line 5\n") == [
+        ("stdout", "3 stdout lines dropped (over 2 lines/s)\n"),
+        ("stdout", "line 5\n"),
+    ]
+    assert reducer.dropped["stdout"] == 3
+
+
+def test_max_rate_includes_summaries():
+    clock = Clock()
+    reducer = LogReducer(window=1, max_rate=2, clock=clock)
+
+    # 5 different lines, each repeated, so 5 summaries are due at once
+    lines = [f"[2025-01-01 00:00:00,000] worker-1/ERROR/locust.user: error {i}\n" for i in range(5)]
+    for line in lines:
+        reducer.feed("stderr", line * 2)
+
+    clock.now += 2
+    output = reducer.flush()
+    assert output == [("stderr", f"{line.rstrip()} (×2)\n") for line in lines[:2]]
+    # 3 of the first occurrences, and 3 of the summaries
+    assert reducer.dropped["stderr"] == 6
+
+    # the notice counts against the rate too, leaving room for a single line
+    clock.now += 1
+    assert reducer.feed("stderr", "a\nb\n") == [
+        ("stderr", "6 stderr lines dropped (over 2 lines/s)\n"),
+        ("stderr", "a\n"),
+    ]
+
+    # but the last one is always written
+    assert reducer.flush(force=True) == [("stderr", "1 stderr lines dropped (over 2 lines/s)\n")]
+
+
+def test_record_level():
+    assert record_level(error_line(0)) == logging.ERROR
+    assert record_level("[2025-01-01 00:00:00,000] worker-1/DEBUG/locust.main: hi\n") == logging.DEBUG
+    assert record_level("Response time percentiles (approximated)\n") is None
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+from locust_cloud import build_payload
+from locust_cloud.args import combined_cloud_parser
+
+
+def payload_for(*args: str, project_data: dict | None = None, dependencies: dict | None = None) -> dict:
+    options, locust_options = combined_cloud_parser.parse_known_args(list(args), env_vars={})
+    return build_payload(
+        options,
+        locust_options,
+        [Path("locustfile.py")],
+        project_data or {"filename": "project.zip", "data": "a"},
+        dependencies or {},
+        "https://api.example.com/1",
+    )
+
+
+def test_keep_warm_payload():
+    payload = payload_for("--keep-warm", "15")
+    assert payload["keep_warm"] == 15
+
+    assert "keep_warm" not in payload_for()
+
+
+def test_keep_warm_must_be_positive(capsys):
+    for value in ["0", "-5", "soon"]:
+        with pytest.raises(SystemExit):
+            combined_cloud_parser.parse_known_args(["--keep-warm", value], env_vars={})
+        assert "argument --keep-warm" in capsys.readouterr().err
+
+
+def test_stack_fingerprint_reuse():
+    fingerprint = payload_for("--workers", "2")["stack_fingerprint"]
+
+    # sent whether or not the run itself keeps the stack warm, and independent of the project files
+    assert payload_for("--workers", "2", "--keep-warm", "5")["stack_fingerprint"] == fingerprint
+    assert (
+        payload_for("--workers", "2", project_data={"filename": "project.zip", "data": "b"})["stack_fingerprint"]
+        == fingerprint
+    )
+
+    # anything the load generators are built from means they can't be reused
+    assert payload_for("--workers", "3")["stack_fingerprint"] != fingerprint
+    assert payload_for("--workers", "2", "--image-tag", "latest")["stack_fingerprint"] != fingerprint
+    assert payload_for("--workers", "2", dependencies={"dependencies_hash": "abc"})["stack_fingerprint"] != fingerprint
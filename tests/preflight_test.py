@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from locust_cloud.preflight import Preflight, compile_error, compile_errors, import_error
+
+LOCUSTFILE = """
+from locust import HttpUser, task
+
+class MyUser(HttpUser):
+    @task
+    def t(self):
+        pass
+"""
+
+
+def test_compile_errors(tmp_path: Path):
+    good = tmp_path / "good.py"
+    good.write_text("x = 1\n")
+    bad = tmp_path / "bad.py"
+    bad.write_text("def f(:\n")
+    data = tmp_path / "data.csv"
+    data.write_text("def f(:\n")
+
+    errors = compile_errors([good, bad, data])
+
+    assert len(errors) == 1
+    assert str(bad) in errors[0]
+
+
+def test_import_error(tmp_path: Path):
+    locustfile = tmp_path / "locustfile.py"
+    locustfile.write_text(LOCUSTFILE)
+    assert import_error([locustfile], timeout=60) is None
+
+    locustfile.write_text(LOCUSTFILE + "\nraise RuntimeError('broken locustfile')\n")
+    error = import_error([locustfile], timeout=60)
+    assert error and "broken locustfile" in error
+
+
+def test_import_error_ignores_missing_modules(tmp_path: Path):
+    locustfile = tmp_path / "locustfile.py"
+    locustfile.write_text("import some_module_that_is_only_in_requirements_txt\n" + LOCUSTFILE)
+
+    assert import_error([locustfile], timeout=60) is None
+
+
+def test_compile_error(tmp_path: Path):
+    good = tmp_path / "good.py"
+    good.write_text("x = 1\n")
+    assert compile_error([good], timeout=60) is None
+
+    bad = tmp_path / "bad.py"
+    bad.write_text("def f(:\n")
+    error = compile_error([good, bad], timeout=60)
+    assert error and str(bad) in error and str(good) not in error
+
+
+def test_preflight(tmp_path: Path):
+    locustfile = tmp_path / "locustfile.py"
+    locustfile.write_text(LOCUSTFILE)
+    helper = tmp_path / "helper.py"
+    helper.write_text("def f(:\n")
+
+    error = Preflight([locustfile], [locustfile, helper]).start().wait()
+
+    assert error and str(helper) in error
+
+
+def test_preflight_import_is_opt_in(tmp_path: Path):
+    locustfile = tmp_path / "locustfile.py"
+    locustfile.write_text(LOCUSTFILE + "\nraise RuntimeError('only works in the cloud')\n")
+
+    assert Preflight([locustfile], [locustfile]).start().wait() is None
+
+    error = Preflight([locustfile], [locustfile], import_check=True).start().wait()
+    assert error and "only works in the cloud" in error
@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+import locust_cloud.readiness
+import pytest
+import requests
+from locust_cloud.readiness import ReadinessError, wait_until_ready
+
+
+def status_session(*statuses):
+    session = MagicMock()
+    responses = []
+    for status in statuses:
+        response = MagicMock()
+        if isinstance(status, int):
+            response.status_code = status
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status} error")
+        else:
+            response.status_code = 200
+            response.json.return_value = status
+        responses.append(response)
+    session.get.side_effect = responses
+    return session
+
+
+def test_wait_until_ready(caplog):
+    caplog.set_level("INFO")
+    session = status_session(
+        {"stage": "pulling_image"},
+        {"stage": "starting_workers", "workers_connected": 0, "worker_count": 2},
+        {"stage": "starting_workers", "workers_connected": 2, "worker_count": 2},
+        {"stage": "ready"},
+    )
+
+    assert wait_until_ready(session, "session-id", poll_interval=0)
+    session.get.assert_called_with("/sessions/session-id/status", timeout=10)
+    assert caplog.messages == [
+        "Pulling image...",
+        "Starting workers...",
+        "0/2 workers connected",
+        "2/2 workers connected",
+    ]
+
+
+@pytest.mark.parametrize("status", [403, 404, 500])
+def test_wait_until_ready_not_supported(status):
+    assert not wait_until_ready(status_session(status), "session-id", poll_interval=0)
+
+
+def test_wait_until_ready_unreachable():
+    session = MagicMock()
+    session.get.side_effect = requests.exceptions.ConnectionError()
+
+    assert not wait_until_ready(session, "session-id", poll_interval=0)
+
+
+def test_wait_until_ready_error_after_stage():
+    session = status_session({"stage": "pulling_image"}, 503, {"stage": "ready"})
+
+    assert wait_until_ready(session, "session-id", poll_interval=0)
+
+
+def test_wait_until_ready_failed():
+    session = status_session({"stage": "installing_dependencies"}, {"stage": "failed", "message": "pip failed"})
+
+    with pytest.raises(ReadinessError, match="pip failed"):
+        wait_until_ready(session, "session-id", poll_interval=0)
+
+
+def test_wait_until_ready_stage_timeout(monkeypatch):
+    monkeypatch.setitem(locust_cloud.readiness.STAGES, "pulling_image", ("Pulling image", 0.05))
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = {"stage": "pulling_image"}
+
+    with pytest.raises(ReadinessError, match="Timed out after 0.05s: Pulling image"):
+        wait_until_ready(session, "session-id", poll_interval=0.01)
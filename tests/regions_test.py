@@ -0,0 +1,139 @@
+import json
+from argparse import ArgumentTypeError
+from unittest import mock
+
+import locust_cloud
+import locust_cloud.regions
+import pytest
+import requests
+import requests_mock
+from locust_cloud.args import combined_cloud_parser, valid_regions
+from locust_cloud.common import get_api_url
+from locust_cloud.regions import nearest_region, probe_latency, run_regions, split_evenly
+
+
+def test_valid_regions():
+    assert valid_regions("us-east-1, eu-north-1,us-east-1") == ["us-east-1", "eu-north-1"]
+
+    with pytest.raises(ArgumentTypeError):
+        valid_regions("us-east-1,mars-1")
+
+    with pytest.raises(ArgumentTypeError):
+        valid_regions(",")
+
+
+def test_split_evenly():
+    assert split_evenly(10, 2) == [5, 5]
+    assert split_evenly(11, 3) == [4, 4, 3]
+    assert split_evenly(1, 2) == [1, 0]
+
+
+def test_run_regions():
+    assert run_regions(["us-east-1", "eu-north-1"], lambda region: None, lambda region: None) is None
+
+
+def test_run_regions_failure_stops_other_regions():
+    stopped = []
+
+    def run_region(region):
+        if region == "eu-north-1":
+            raise Exception("Deploy failed")
+
+    assert run_regions(["us-east-1", "eu-north-1"], run_region, stopped.append) == 1
+    assert stopped == ["us-east-1"]
+
+
+def test_nearest_region(tmp_path, monkeypatch):
+    latencies = {"us-east-1": 0.1, "eu-north-1": 0.02}
+    monkeypatch.setattr(locust_cloud.regions, "probe_latency", lambda region: latencies.get(region))
+    cache_file = tmp_path / "nearest-region.json"
+
+    assert nearest_region(cache_file) == "eu-north-1"
+
+    # cached
+    latencies = {"us-east-1": 0.01, "eu-north-1": 0.02}
+    assert nearest_region(cache_file) == "eu-north-1"
+
+    cache_file.write_text(json.dumps({"region": "eu-north-1", "expires": 0}))
+    assert nearest_region(cache_file) == "us-east-1"
+
+
+def test_nearest_region_unreachable(tmp_path, monkeypatch):
+    monkeypatch.setattr(locust_cloud.regions, "probe_latency", lambda region: None)
+
+    assert nearest_region(tmp_path / "nearest-region.json") is None
+    assert not (tmp_path / "nearest-region.json").exists()
+
+
+def test_probe_latency():
+    with requests_mock.Mocker() as m:
+        m.get(get_api_url("us-east-1"), status_code=404)
+        assert probe_latency("us-east-1", attempts=2) is not None
+        assert m.call_count == 2
+
+        m.get(get_api_url("us-east-1"), exc=requests.exceptions.ConnectTimeout)
+        assert probe_latency("us-east-1") is None
+
+
+def test_region_option_ignores_login_region_env():
+    options, _ = combined_cloud_parser.parse_known_args(["--delete"], env_vars={"LOCUSTCLOUD_REGION": "eu-north-1"})
+    assert options.region is None
+
+    options, _ = combined_cloud_parser.parse_known_args(["--delete"], env_vars={"LOCUSTCLOUD_RUN_REGION": "eu-north-1"})
+    assert options.region == "eu-north-1"
+
+
+def test_delete_in_every_region(monkeypatch):
+    sessions = []
+    monkeypatch.setattr(
+        locust_cloud, "ApiSession", lambda non_interactive, region: sessions.append(region) or mock.MagicMock()
+    )
+
+    options, _ = combined_cloud_parser.parse_known_args(["--delete", "--regions", "us-east-1,eu-north-1"], env_vars={})
+    locust_cloud.delete(options)
+    assert sessions == ["us-east-1", "eu-north-1"]
+
+    sessions.clear()
+    options, _ = combined_cloud_parser.parse_known_args(["--delete", "--region", "eu-north-1"], env_vars={})
+    locust_cloud.delete(options)
+    assert sessions == ["eu-north-1"]
+
+
+def test_main_regions_rejects_too_small_split(caplog):
+    options, _ = combined_cloud_parser.parse_known_args(["--regions", "us-east-1,eu-north-1"], env_vars={})
+    options.users = 1
+
+    assert locust_cloud.main_regions(options, [], []) == 1
+    assert "--users (1) must be at least the number of regions (2)" in caplog.text
+
+
+def test_main_regions_interrupt_tears_down_each_session(monkeypatch):
+    sessions = {}
+    monkeypatch.setattr(locust_cloud, "start_preflight", lambda *args: None)
+    monkeypatch.setattr(locust_cloud, "package_project", lambda *args: {})
+    monkeypatch.setattr(locust_cloud, "resolve_dependencies", lambda *args: {})
+    monkeypatch.setattr(locust_cloud, "build_payload", lambda *args: {})
+    monkeypatch.setattr(
+        locust_cloud,
+        "create_session",
+        lambda options, region, agent: sessions.setdefault(region, mock.MagicMock()),
+    )
+
+    def run(session, payload, options, start_time, on_deployed, **kwargs):  # noqa: ARG001
+        on_deployed(f"session-{options.users}")
+
+    def run_regions(regions, run_region, stop_region):  # noqa: ARG001
+        for region in regions:
+            run_region(region)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(locust_cloud, "run", run)
+    monkeypatch.setattr(locust_cloud, "run_regions", run_regions)
+    options, _ = combined_cloud_parser.parse_known_args(
+        ["--regions", "us-east-1,eu-north-1", "--no-agent"], env_vars={}
+    )
+    options.users = 3
+
+    assert locust_cloud.main_regions(options, [], []) == 1
+    sessions["us-east-1"].teardown.assert_called_once_with("KeyboardInterrupt", session_id="session-2")
+    sessions["eu-north-1"].teardown.assert_called_once_with("KeyboardInterrupt", session_id="session-1")
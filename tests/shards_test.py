@@ -0,0 +1,102 @@
+import io
+from pathlib import Path
+from zipfile import ZipFile
+
+import locust_cloud.shards
+from locust_cloud.local_deployer import LocalApiSession, LocalDeployer
+from locust_cloud.shards import SHARD_DIR_ENV, shard_archives, shard_path, split_csv, split_lines, upload_shards
+
+
+def split(data: bytes, parts: int, header: bool = False) -> list[bytes]:
+    outputs = [io.BytesIO() for _ in range(parts)]
+    split_lines(io.BytesIO(data), len(data), outputs, header=header)
+    return [output.getvalue() for output in outputs]
+
+
+def test_split_lines():
+    data = b"".join(f"line {i}\n".encode() for i in range(100))
+    parts = split(data, 3)
+
+    assert b"".join(parts) == data
+    assert all(part.endswith(b"\n") for part in parts)
+    assert max(len(part) for part in parts) - min(len(part) for part in parts) <= 2 * len(b"line 10\n")
+
+
+def test_split_lines_small_chunks(monkeypatch):
+    monkeypatch.setattr(locust_cloud.shards, "CHUNK_SIZE", 3)
+    data = b"a\nbb\nccc\ndddd\neeeee\n"
+
+    assert b"".join(split(data, 4)) == data
+    assert split(data, 1) == [data]
+    assert b"".join(split(b"a\nb", 2)) == b"a\nb"
+
+
+def test_split_lines_header():
+    parts = split(b"id,name\n1,a\n2,b\n3,c\n4,d\n", 2, header=True)
+
+    assert parts == [b"id,name\n1,a\n2,b\n", b"id,name\n3,c\n4,d\n"]
+
+
+def test_split_csv_quoted_newlines():
+    rows = [f'{i},"line one\nline two ""{i}"""\r\n'.encode() for i in range(20)]
+    data = b"id,text\r\n" + b"".join(rows)
+    outputs = [io.BytesIO() for _ in range(3)]
+
+    assert split_csv(io.BytesIO(data), len(data), outputs) == b"id,text\r\n"
+
+    parts = [output.getvalue() for output in outputs]
+    assert all(part.startswith(b"id,text\r\n") for part in parts)
+    assert b"".join(part.removeprefix(b"id,text\r\n") for part in parts) == b"".join(rows)
+    assert all(len(part) > len(b"id,text\r\n") for part in parts)
+
+
+def test_shard_archives(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("data").mkdir()
+    Path("data/users.csv").write_text("user\n" + "".join(f"user{i}\n" for i in range(10)))
+    Path("data/lines.txt").write_text("".join(f"line{i}\n" for i in range(10)))
+
+    archives = shard_archives([Path("data/users.csv"), Path("data/lines.txt")], 2)
+    assert len(archives) == 3
+
+    users = []
+    lines = []
+    for archive in archives[:-1]:
+        with archive, ZipFile(archive) as zf:
+            assert zf.namelist() == ["data/users.csv", "data/lines.txt"]
+            users_part = zf.read("data/users.csv").decode().splitlines()
+            assert users_part[0] == "user"
+            users += users_part[1:]
+            lines += zf.read("data/lines.txt").decode().splitlines()
+
+    assert users == [f"user{i}" for i in range(10)]
+    assert lines == [f"line{i}" for i in range(10)]
+
+    # the master only gets the header row
+    with archives[-1], ZipFile(archives[-1]) as zf:
+        assert zf.read("data/users.csv") == b"user\n"
+        assert zf.read("data/lines.txt") == b""
+
+
+def test_upload_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("users.csv").write_text("user\n" + "".join(f"user{i}\n" for i in range(10)))
+    deployer = LocalDeployer()
+    deployer.start()
+    try:
+        fields = upload_shards(LocalApiSession(deployer), [Path("users.csv")], 2)
+
+        assert len(fields["shards"]) == 2
+        for shard_id in [*fields["shards"], fields["master_shard"]]:
+            with ZipFile(Path(deployer.shard_dir.name) / shard_id) as zf:
+                assert zf.read("users.csv").startswith(b"user\n")
+    finally:
+        deployer.stop()
+
+
+def test_shard_path(monkeypatch):
+    monkeypatch.delenv(SHARD_DIR_ENV, raising=False)
+    assert shard_path("data/users.csv") == Path("data/users.csv")
+
+    monkeypatch.setenv(SHARD_DIR_ENV, "/shards/1")
+    assert shard_path("data/users.csv") == Path("/shards/1/data/users.csv")
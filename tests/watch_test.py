@@ -0,0 +1,50 @@
+import os
+
+from locust_cloud.watch import ProjectWatcher
+
+
+def test_project_watcher(tmp_path):
+    locustfile = tmp_path / "locustfile.py"
+    helper = tmp_path / "helper.py"
+    new_helper = tmp_path / "new_helper.py"
+    for path in (locustfile, helper, new_helper):
+        path.write_text("")
+
+    files = {locustfile, helper}
+    changes = []
+    watcher = ProjectWatcher(lambda: set(files), lambda *change: changes.append(change), debounce=0.01)
+
+    assert not watcher.poll()
+
+    locustfile.write_text("import helper\nimport new_helper\n")
+    os.utime(locustfile, ns=(0, 0))
+    files.add(new_helper)
+    assert watcher.poll()
+    assert changes == [([locustfile, new_helper], [])]
+
+    helper.unlink()
+    assert watcher.poll()
+    assert changes[-1] == ([], [helper])
+
+    assert not watcher.poll()
+
+
+def test_project_watcher_unimported_file_is_not_deleted(tmp_path):
+    locustfile = tmp_path / "locustfile.py"
+    helper = tmp_path / "helper.py"
+    locustfile.write_text("import helper\n")
+    helper.write_text("")
+
+    files = {locustfile, helper}
+    changes = []
+    watcher = ProjectWatcher(lambda: set(files), lambda *change: changes.append(change), debounce=0.01)
+
+    locustfile.write_text("")
+    os.utime(locustfile, ns=(0, 0))
+    files.remove(helper)
+    assert watcher.poll()
+    assert changes == [([locustfile], [])]
+
+    # no longer watched
+    helper.write_text("VALUE = 1\n")
+    assert not watcher.poll()
@@ -79,3 +79,19 @@ def test_browser_login_succeded(mocked_requests, monkeypatch, capsys):  # noqa:
         region=REGION,
     )
     mock.assert_called_once_with(expected_cloud_config)
+
+
+def test_wait_for_authorization_long_polls_with_backoff(mocked_requests):
+    sleeps = []
+    mocked_requests.get(
+        f"{API_URL}/cli-auth/result/{AUTH_ID}",
+        [{"json": {"state": "pending"}}] * 7 + [{"json": {"state": "authorized"}}],
+    )
+    data = locust_cloud.web_login.wait_for_authorization(f"{API_URL}/cli-auth/result/{AUTH_ID}", sleep=sleeps.append)
+
+    assert data == {"state": "authorized"}
+    result_requests = [r for r in mocked_requests.request_history if r.method == "GET"]
+    assert len(result_requests) == 8
+    assert all(r.qs == {"wait": [str(locust_cloud.web_login.LONG_POLL_TIMEOUT)]} for r in result_requests)
+    # The server answered right away, so we back off between attempts, but never for more than a second
+    assert sleeps == pytest.approx([0.1, 0.15, 0.225, 0.3375, 0.50625, 0.759375, 1])
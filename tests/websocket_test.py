@@ -1,3 +1,4 @@
+import logging
 import threading
 import time
 
@@ -8,7 +9,10 @@ import geventwebsocket.handler
 import pytest
 import socketio
 import socketio.exceptions
-from locust_cloud.websocket import SessionMismatchError, Websocket, WebsocketTimeout
+from locust_cloud.controls import RuntimeControls
+from locust_cloud.log_file import LogFile
+from locust_cloud.log_reducer import LogReducer
+from locust_cloud.websocket import Deadline, SessionMismatchError, Websocket, WebsocketTimeout
 
 LOCUSTCLOUD_SESSION_ID = "valid-session-id"
 
@@ -68,6 +72,20 @@ def websocket_server():
         sio.call("events", {"events": [{"type": "stderr", "message": data}], "id": 3}, to=sid, timeout=5)
         sio.call("events", {"events": [{"type": "stderr", "message": data}], "id": 3}, to=sid, timeout=5)
 
+    @sio.event
+    def control(sid, data):
+        print("Got control command from test")
+        message = " ".join(str(value) for value in data.values())
+        sio.call("events", {"events": [{"type": "stdout", "message": f"{message}\n"}], "id": 100}, to=sid, timeout=5)
+
+    @sio.event
+    def subscribe(sid, data=None):  # noqa: ARG001
+        print("Got subscribe from test")
+        # Send everything regardless of the cursor, the client should skip what it has already seen
+        for event_id in (200, 201):
+            message = f"event {event_id}\n"
+            sio.call("events", {"events": [{"type": "stdout", "message": message}], "id": event_id}, to=sid, timeout=5)
+
     def start_websocket_server():
         print("Starting websocket server")
         server.serve_forever()
@@ -137,6 +155,146 @@ def test_websocket_deduplication(capsys):
     assert captured.err == "pineapple\n"
 
 
+def test_websocket_prefix(capsys):
+    ws = Websocket(prefix="checkout")
+    ws.connect(
+        "http://127.0.0.1:1095",
+        auth=LOCUSTCLOUD_SESSION_ID,
+    )
+
+    ws.sio.call("trigger_stderr", "banana\nmango\n")
+    captured = capsys.readouterr()
+    assert captured.err == "[checkout] banana\n[checkout] mango\n" * 2
+
+
+def test_websocket_reducer(capsys):
+    ws = Websocket(reducer=LogReducer(window=0.1))
+    ws.connect(
+        "http://127.0.0.1:1095",
+        auth=LOCUSTCLOUD_SESSION_ID,
+    )
+
+    line = "[2025-01-01 00:00:00,000] worker-1/ERROR/locust.user: banana\n"
+    ws.sio.call("trigger_stderr", line)
+    captured = capsys.readouterr()
+    assert captured.err == line
+
+    # the summary is printed once no more lines have arrived for a while
+    output = ""
+    for _ in range(30):
+        output += capsys.readouterr().err
+        if output:
+            break
+        time.sleep(0.1)
+
+    assert output == f"{line.rstrip()} (×2)\n"
+    ws.shutdown()
+
+
+def test_websocket_log_file(capsys, tmp_path):
+    log_file = LogFile(tmp_path / "run.log").start()
+    ws = Websocket(log_file=log_file, terminal_level=logging.WARNING)
+    ws.connect(
+        "http://127.0.0.1:1095",
+        auth=LOCUSTCLOUD_SESSION_ID,
+    )
+
+    lines = "[2025-01-01 00:00:00,000] worker-1/INFO/locust.runners: Spawning\nTraceback (most recent call last):\n"
+    ws.sio.call("trigger_stderr", lines)
+    captured = capsys.readouterr()
+    assert captured.err == "Traceback (most recent call last):\n" * 2
+
+    ws.shutdown()
+    log_file.close()
+    assert (tmp_path / "run.log").read_text() == lines * 2
+
+
+def test_runtime_controls(capsys):
+    ws = Websocket()
+    controls = RuntimeControls(ws, users_step=5)
+    ws.connect(
+        "http://127.0.0.1:1095",
+        auth=LOCUSTCLOUD_SESSION_ID,
+    )
+
+    controls.bindings["-"]()
+
+    output = ""
+    for _ in range(20):
+        output += capsys.readouterr().out
+        if "spawn -5\n" in output:
+            break
+        time.sleep(0.1)
+
+    assert "spawn -5\n" in output
+    ws.shutdown()
+
+
+def test_websocket_subscribe_cursor(capsys):
+    ws = Websocket()
+    ws.connect(
+        "http://127.0.0.1:1095",
+        auth=LOCUSTCLOUD_SESSION_ID,
+    )
+    ws.subscribe(cursor=200)
+
+    for _ in range(50):
+        if ws.last_event_id == 201:
+            break
+        time.sleep(0.1)
+    ws.shutdown()
+
+    assert ws.last_event_id == 201
+    output = capsys.readouterr().out
+    assert "event 201" in output
+    assert "event 200" not in output
+
+
+def test_deadline():
+    expired = threading.Event()
+    deadline = Deadline(expired.set)
+
+    deadline.set(0.1)
+    deadline.cancel()
+    assert not expired.wait(0.3)
+
+    deadline.set(10)
+    deadline.set(0.1)  # replaces the pending deadline
+    assert expired.wait(1)
+
+    expired.clear()
+    deadline.set(0.1)
+    deadline.close()
+    assert not expired.wait(0.3)
+
+    with pytest.raises(RuntimeError):
+        deadline.set(0.1)
+
+
+def test_deadline_starts_no_threads():
+    threads = threading.active_count()
+    deadline = Deadline(lambda: None)
+    for _ in range(100):
+        deadline.set(10)
+    assert threading.active_count() == threads
+    deadline.close()
+
+
+def test_websocket_reconnects_add_no_threads():
+    ws = Websocket()
+    ws.connect(
+        "http://127.0.0.1:1095",
+        auth=LOCUSTCLOUD_SESSION_ID,
+    )
+    # the socketio client runs a few threads of its own, but reconnects should not add any
+    threads_connected = threading.active_count()
+    for _ in range(5):
+        ws.sio.disconnect()
+        ws.sio.connect("http://127.0.0.1:1095", auth=LOCUSTCLOUD_SESSION_ID)
+    assert threading.active_count() <= threads_connected
+    ws.shutdown()
+
+
 def test_websocket_failed_reconnect():
     # FIXME: This test needs to be placed last. It messes up connecting from subsequent tests and I can't be bothered to debug it right now.
     ws = Websocket()